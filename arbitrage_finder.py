@@ -1,69 +1,172 @@
-def find_arbitrage_opportunities(odds_data):
+from name_table import team_names
+from telemetry import timed
+
+# Market types evaluated for arbitrage. h2h and outrights are N-way markets where every
+# listed outcome must be backed; spreads and totals are evaluated as pairs of lines.
+MARKET_TYPES = ['h2h', 'spreads', 'totals', 'outrights']
+N_WAY_MARKETS = ['h2h', 'outrights']
+
+# Default bankroll used to size the stake on each leg of an opportunity
+DEFAULT_BANKROLL = 100
+
+@timed('detect', engine='dict')
+def find_arbitrage_opportunities(odds_data, bankroll=DEFAULT_BANKROLL, edge_index=None, names=team_names, movement=None):
+    """Arbitrage opportunities in an odds payload; also refreshes `edge_index` (a market_edges.MarketEdgeIndex) if given.
+
+    Team and outcome names are canonicalized through `names` (a name_table.NameTable). With
+    `movement` (a line_movement.PriceHistory), prices are recorded in it and each opportunity
+    is scored for staleness and velocity.
+    """
     opportunities = []
     
     for event in odds_data:
-        event_name = f"{event.get('home_team')} vs {event.get('away_team')}"
+        if movement is not None:
+            movement.record_event(event)
+        teams = names.event_teams(event)
+        event_name = names.event_name(event, teams)
 
-        for market_type in ['h2h', 'spreads', 'totals']:
+        for market_type in MARKET_TYPES:
             best_odds = {}
 
             for bookmaker in event.get('bookmakers', []):
                 for market in bookmaker.get('markets', []):
                     if market['key'] == market_type:
-                        for outcome in market.get('outcomes', []):
-                            key = (outcome['name'], outcome.get('point'))
-                            odds = outcome['price']
-                            if key not in best_odds or odds > best_odds[key]['odds']:
-                                best_odds[key] = {
-                                    'bookmaker': bookmaker['title'],
-                                    'odds': odds,
-                                    'point': outcome.get('point')
-                                }
-
-            if market_type == 'h2h' and len(best_odds) == 2:
-                opportunities.extend(check_arbitrage(event_name, market_type, best_odds))
-            elif market_type in ['spreads', 'totals'] and len(best_odds) >= 2:
-                opportunities.extend(check_arbitrage(event_name, market_type, best_odds))
+                        update_best_odds(best_odds, bookmaker['title'], market.get('outcomes', []), names, teams)
+
+            if edge_index is not None:
+                edge_index.update_market(event.get('id'), market_type, best_odds, event_name, event.get('sport_key'),
+                                         teams)
+            if len(best_odds) >= 2:
+                opportunities.extend(check_arbitrage(event_name, market_type, best_odds, bankroll,
+                                                     event_id=event.get('id'), sport=event.get('sport_key'),
+                                                     movement=movement, teams=teams))
 
+    if edge_index is not None:
+        # Drop the events of these sports that have left the payload (finished games)
+        edge_index.prune({event.get('sport_key') for event in odds_data}, {event.get('id') for event in odds_data})
     return opportunities
 
-def check_arbitrage(event_name, market_type, best_odds):
+def update_best_odds(best_odds, bookmaker, outcomes, names=None, teams=()):
+    """Fold one bookmaker's outcomes for a market into `best_odds`, keeping the earlier bookmaker on ties.
+
+    With `names`, outcome names are canonicalized, fuzzy-matching against the event's `teams`.
+    """
+    for outcome in outcomes:
+        name = outcome['name'] if names is None else names.canonical(outcome['name'], teams)
+        key = (name, outcome.get('point'))
+        odds = outcome['price']
+        if key not in best_odds or odds > best_odds[key]['odds']:
+            best_odds[key] = {
+                'bookmaker': bookmaker,
+                'odds': odds,
+                'point': outcome.get('point')
+            }
+    return best_odds
+
+def check_arbitrage(event_name, market_type, best_odds, bankroll=DEFAULT_BANKROLL, event_id=None, sport=None, movement=None,
+                    teams=()):
     opportunities = []
-    odds_list = list(best_odds.values())
 
-    if market_type == 'h2h':
-        arb_percentage = calculate_arbitrage_percentage(odds_list[0]['odds'], odds_list[1]['odds'])
+    if market_type in N_WAY_MARKETS:
+        # Every outcome (including a draw or each outright runner) is one leg of the arb
+        arb_percentage = calculate_arbitrage_percentage(*(odds['odds'] for odds in best_odds.values()))
         if arb_percentage < 100:
-            opportunities.append(create_opportunity(event_name, market_type, best_odds, arb_percentage))
+            opportunities.append(create_opportunity(event_name, market_type, best_odds, arb_percentage, bankroll,
+                                                    event_id=event_id, sport=sport, movement=movement))
     else:  # spreads or totals
-        for i in range(len(odds_list)):
-            for j in range(i + 1, len(odds_list)):
-                if odds_list[i]['point'] != odds_list[j]['point']:
-                    arb_percentage = calculate_arbitrage_percentage(odds_list[i]['odds'], odds_list[j]['odds'])
-                    if arb_percentage < 100:
-                        opportunities.append(create_opportunity(event_name, market_type, 
-                                                                {k: v for k, v in best_odds.items() if v in [odds_list[i], odds_list[j]]}, 
-                                                                arb_percentage))
+        # Only complementary sides of the same line can form an arb
+        for sides in index_market_lines(market_type, best_odds, teams).values():
+            if len(sides) == 2:
+                pair = {key: best_odds[key] for key in sides.values()}
+                arb_percentage = calculate_arbitrage_percentage(*(odds['odds'] for odds in pair.values()))
+                if arb_percentage < 100:
+                    opportunities.append(create_opportunity(event_name, market_type, pair, arb_percentage, bankroll,
+                                                            event_id=event_id, sport=sport, movement=movement))
 
     return opportunities
 
-def create_opportunity(event_name, market_type, odds_data, arb_percentage):
+def index_market_lines(market_type, best_odds, teams=()):
+    """Index spreads/totals outcomes by market line as {line: {side: outcome key}}.
+
+    Totals are keyed by the total, with Over and Under as the two sides. Spreads are keyed by
+    the line from the home team's perspective (`teams` is the event's canonical (home, away)),
+    so the home team's -x and the away team's +x land under the same key. A spread outcome
+    naming neither team (a spelling that did not resolve) is dropped: treating it as the other
+    side would pair two bets on the same team. Without `teams`, the first two names listed
+    are used. Each line then holds at most one complementary pair.
+    """
+    lines = {}
+    home, away = teams if teams else (None, None)
+    for key in best_odds:
+        name, point = key
+        if point is None:
+            continue
+        if market_type == 'spreads':
+            if home is None:
+                home = name
+            elif away is None and name != home:
+                away = name
+            if name == home:
+                line = point
+            elif name == away:
+                line = -point
+            else:
+                continue
+        else:
+            line = point
+        lines.setdefault(line, {})[name] = key
+    return lines
+
+def create_opportunity(event_name, market_type, odds_data, arb_percentage, bankroll=DEFAULT_BANKROLL, event_id=None, sport=None,
+                       movement=None):
+    """Opportunity record for a set of best odds; `movement` (a line_movement.PriceHistory) adds staleness scores."""
     outcomes = list(odds_data.keys())
-    return {
+    stakes = calculate_stakes([odds_data[outcome]['odds'] for outcome in outcomes], bankroll)
+    opportunity = {
+        'sport': sport,
+        'event_id': event_id,
         'event_name': event_name,
         'market_type': market_type,
-        'outcome_name': f"{outcomes[0][0]} vs {outcomes[1][0]}",
-        'point': f"{outcomes[0][1]} / {outcomes[1][1]}",
+        'outcome_name': ' vs '.join(str(outcome[0]) for outcome in outcomes),
+        'point': ' / '.join(str(outcome[1]) for outcome in outcomes),
         'bookmaker': odds_data[outcomes[0]]['bookmaker'],
         'odds': odds_data[outcomes[0]]['odds'],
         'comparison_bookmaker': odds_data[outcomes[1]]['bookmaker'],
         'comparison_odds': odds_data[outcomes[1]]['odds'],
-        'arb_percentage': arb_percentage
+        'arb_percentage': arb_percentage,
+        'legs': [
+            {
+                'outcome': outcome[0],
+                'point': outcome[1],
+                'bookmaker': odds_data[outcome]['bookmaker'],
+                'odds': odds_data[outcome]['odds'],
+                'stake': stake
+            }
+            for outcome, stake in zip(outcomes, stakes)
+        ],
+        'profit': bankroll * 100 / arb_percentage - bankroll
     }
+    if movement is not None:
+        opportunity.update(movement.score(event_id, market_type, opportunity['legs']))
+    return opportunity
+
+def opportunity_key(opportunity):
+    """Identify an opportunity by event, market and the outcomes it backs, independent of books and prices."""
+    return (
+        opportunity['event_id'],
+        opportunity['market_type'],
+        tuple((leg['outcome'], leg['point']) for leg in opportunity['legs'])
+    )
+
+def calculate_arbitrage_percentage(*odds):
+    """Calculate the arbitrage percentage (sum of implied probabilities) of a set of outcomes."""
+    return sum(1 / price for price in odds) * 100
 
-def calculate_arbitrage_percentage(odds_a, odds_b):
-    """Calculate the arbitrage percentage of two outcomes."""
-    return (1 / odds_a + 1 / odds_b) * 100
+def calculate_stakes(odds, bankroll=DEFAULT_BANKROLL):
+    """Split `bankroll` across outcomes so that every outcome pays out the same amount."""
+    implied = [1 / price for price in odds]
+    total = sum(implied)
+    return [bankroll * probability / total for probability in implied]
 
 # If you want to run this file independently, you can add a main function:
 if __name__ == "__main__":
@@ -0,0 +1,250 @@
+"""Backtest the arbitrage engine over captured odds snapshots.
+
+Replays snapshots in timestamp order through `find_arbitrage_opportunities_df` and tracks
+each opportunity from the snapshot where it first appears to the one where it disappears.
+Snapshots come from the Parquet odds history (odds_history.py) or from CSV files in the
+`odds_data.csv` layout. CSVs are read once, in chunks, and split by sport and snapshot into a
+temporary directory before any worker starts; a `fetched_at` column stamps the snapshots,
+otherwise each file is one snapshot stamped with its modification time. Snapshots are
+replayed in timestamp order across all files. Sports are independent, so each one is
+replayed in its own worker process and only one snapshot per sport is held in memory at a
+time.
+
+    python backtest.py --start 2024-01-01 --end 2024-03-31
+    python backtest.py --csv captures/*.csv --workers 4 --output opportunities.csv
+"""
+import argparse
+import os
+import statistics
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from arbitrage_finder import DEFAULT_BANKROLL, opportunity_key
+from odds_flattener import CATEGORY_COLUMNS, FLAT_COLUMNS
+from odds_history import OddsHistoryStore
+from vectorized_arbitrage import find_arbitrage_opportunities_df
+
+CSV_CHUNK_ROWS = 250_000
+CSV_DTYPES = {**{column: 'category' for column in CATEGORY_COLUMNS}, 'price': 'float64', 'point': 'float64'}
+
+
+def _timestamp(value):
+    if value is None:
+        return None
+    moment = pd.Timestamp(value)
+    return (moment if moment.tzinfo else moment.tz_localize('UTC')).to_pydatetime()
+
+
+def split_csv_snapshots(paths, directory, start=None, end=None, sports=None, chunksize=CSV_CHUNK_ROWS):
+    """Read each CSV file once and spill its rows into `directory` by sport and snapshot.
+
+    Returns {sport: [(fetched_at, [piece paths])]} with each sport's snapshots in fetched_at
+    order. A snapshot split across chunks or files has one piece per part; pieces with the
+    same timestamp are replayed together.
+    """
+    start, end = _timestamp(start), _timestamp(end)
+    wanted = set(sports) if sports is not None else None
+    pieces = {}  # sport -> {fetched_at: [piece paths]}
+    count = 0
+    for path in paths:
+        file_time = datetime.fromtimestamp(os.path.getmtime(path), timezone.utc).isoformat()
+        for chunk in pd.read_csv(path, dtype=CSV_DTYPES, chunksize=chunksize):
+            if 'fetched_at' not in chunk.columns:
+                chunk = chunk.assign(fetched_at=file_time)
+            for (sport, stamp), group in chunk.groupby(['sport', 'fetched_at'], observed=True, sort=False):
+                if wanted is not None and sport not in wanted:
+                    continue
+                fetched_at = _timestamp(stamp)
+                if (start and fetched_at < start) or (end and fetched_at > end):
+                    continue
+                piece = os.path.join(directory, f'{count}.pkl')
+                count += 1
+                group[FLAT_COLUMNS].to_pickle(piece)
+                pieces.setdefault(sport, {}).setdefault(fetched_at, []).append(piece)
+    return {sport: sorted(snapshots.items()) for sport, snapshots in pieces.items()}
+
+
+def iter_csv_snapshots(sport, snapshots):
+    """Yield (sport, fetched_at, DataFrame) for one sport's snapshots from split_csv_snapshots."""
+    for fetched_at, piece_paths in snapshots:
+        frames = [pd.read_pickle(piece) for piece in piece_paths]
+        yield sport, fetched_at, pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+
+class OpportunityTracker:
+    """Follows opportunities across consecutive snapshots of one sport."""
+
+    def __init__(self):
+        self.open = {}     # opportunity_key -> record
+        self.closed = []
+        self.snapshots = 0
+        self.bookmakers = {}  # title -> {'quoted_snapshots', 'arb_snapshots'}
+
+    def observe(self, fetched_at, odds_df, opportunities):
+        """Record one snapshot's opportunities; those missing since the last snapshot are closed at `fetched_at`."""
+        self.snapshots += 1
+        current = {opportunity_key(opportunity): opportunity for opportunity in opportunities}
+
+        for key in [key for key in self.open if key not in current]:
+            record = self.open.pop(key)
+            record['closed_at'] = fetched_at
+            self.closed.append(record)
+
+        for key, opportunity in current.items():
+            record = self.open.get(key)
+            if record is None:
+                self.open[key] = {
+                    'sport': opportunity['sport'],
+                    'event_id': opportunity['event_id'],
+                    'event_name': opportunity['event_name'],
+                    'market_type': opportunity['market_type'],
+                    'outcome_name': opportunity['outcome_name'],
+                    'point': opportunity['point'],
+                    'bookmakers': ' / '.join(leg['bookmaker'] for leg in opportunity['legs']),
+                    'first_seen': fetched_at,
+                    'last_seen': fetched_at,
+                    'closed_at': None,
+                    'snapshots': 1,
+                    'arb_percentage': opportunity['arb_percentage'],
+                    'best_arb_percentage': opportunity['arb_percentage'],
+                    'profit': opportunity['profit'],
+                }
+            else:
+                record['last_seen'] = fetched_at
+                record['snapshots'] += 1
+                record['best_arb_percentage'] = min(record['best_arb_percentage'], opportunity['arb_percentage'])
+
+        arb_books = {leg['bookmaker'] for opportunity in opportunities for leg in opportunity['legs']}
+        for bookmaker in odds_df['bookmaker'].unique():
+            if pd.isna(bookmaker):
+                continue
+            stats = self.bookmakers.setdefault(bookmaker, {'quoted_snapshots': 0, 'arb_snapshots': 0})
+            stats['quoted_snapshots'] += 1
+            stats['arb_snapshots'] += bookmaker in arb_books
+
+    def finish(self):
+        """Close the bookkeeping; opportunities still open at the last snapshot keep closed_at None."""
+        records = self.closed + list(self.open.values())
+        for record in records:
+            end = record['closed_at'] or record['last_seen']
+            record['duration_s'] = (end - record['first_seen']).total_seconds()
+        return records
+
+
+def backtest_sport(source, sport, start=None, end=None, bankroll=DEFAULT_BANKROLL):
+    """Replay one sport's snapshots; `source` is ('history', root) or ('csv', that sport's split_csv_snapshots list)."""
+    kind, location = source
+    if kind == 'history':
+        snapshots = OddsHistoryStore(location).iter_snapshots(sport, start, end)
+    else:
+        snapshots = iter_csv_snapshots(sport, location)
+
+    tracker = OpportunityTracker()
+    for _, fetched_at, odds_df in snapshots:
+        tracker.observe(fetched_at, odds_df, find_arbitrage_opportunities_df(odds_df, bankroll))
+    return {'sport': sport, 'snapshots': tracker.snapshots, 'opportunities': tracker.finish(),
+            'bookmakers': tracker.bookmakers}
+
+
+def run_backtest(source, sports=None, start=None, end=None, bankroll=DEFAULT_BANKROLL, workers=None):
+    """Backtest every sport in `source` (or just `sports`), one worker process per sport.
+
+    `source` is ('history', root) or ('csv', paths); CSV files are split by sport once, up front.
+    """
+    kind, location = source
+    if kind == 'history':
+        if sports is None:
+            sports = OddsHistoryStore(location).sports()
+        return _run_sports({sport: source for sport in sports}, start, end, bankroll, workers)
+    with tempfile.TemporaryDirectory() as directory:
+        split = split_csv_snapshots(location, directory, start, end, sports)
+        return _run_sports({sport: ('csv', split[sport]) for sport in sorted(split)}, start, end, bankroll, workers)
+
+
+def _run_sports(sources, start, end, bankroll, workers):
+    if not sources:
+        return []
+    if workers == 1 or len(sources) == 1:
+        return [backtest_sport(source, sport, start, end, bankroll) for sport, source in sources.items()]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(backtest_sport, source, sport, start, end, bankroll) for sport, source in sources.items()]
+        return [future.result() for future in futures]
+
+
+def summarize(results):
+    """Overall and per-bookmaker statistics for the per-sport results of run_backtest."""
+    opportunities = [record for result in results for record in result['opportunities']]
+    durations = [record['duration_s'] for record in opportunities]
+
+    bookmakers = {}
+    for result in results:
+        for bookmaker, stats in result['bookmakers'].items():
+            totals = bookmakers.setdefault(bookmaker, {'quoted_snapshots': 0, 'arb_snapshots': 0, 'opportunities': 0})
+            totals['quoted_snapshots'] += stats['quoted_snapshots']
+            totals['arb_snapshots'] += stats['arb_snapshots']
+    for record in opportunities:
+        for bookmaker in set(record['bookmakers'].split(' / ')):
+            bookmakers.setdefault(bookmaker, {'quoted_snapshots': 0, 'arb_snapshots': 0, 'opportunities': 0})
+            bookmakers[bookmaker]['opportunities'] += 1
+    for stats in bookmakers.values():
+        stats['hit_rate'] = stats['arb_snapshots'] / stats['quoted_snapshots'] if stats['quoted_snapshots'] else 0.0
+
+    return {
+        'sports': len(results),
+        'snapshots': sum(result['snapshots'] for result in results),
+        'opportunities': len(opportunities),
+        'still_open': sum(record['closed_at'] is None for record in opportunities),
+        'median_duration_s': statistics.median(durations) if durations else 0.0,
+        'mean_duration_s': statistics.fmean(durations) if durations else 0.0,
+        'max_duration_s': max(durations, default=0.0),
+        'theoretical_profit': sum(record['profit'] for record in opportunities),
+        'by_market': pd.Series([record['market_type'] for record in opportunities], dtype=object).value_counts().to_dict(),
+        'bookmakers': bookmakers,
+    }
+
+
+def print_summary(summary, bankroll):
+    print(f"Sports: {summary['sports']}  Snapshots: {summary['snapshots']}  "
+          f"Opportunities: {summary['opportunities']} ({summary['still_open']} still open at the end)")
+    print(f"Duration (s): median {summary['median_duration_s']:.0f}, mean {summary['mean_duration_s']:.0f}, "
+          f"max {summary['max_duration_s']:.0f}")
+    print(f"Theoretical profit at a {bankroll} bankroll per opportunity: {summary['theoretical_profit']:.2f}")
+    for market_type, count in summary['by_market'].items():
+        print(f"  {market_type}: {count}")
+    if summary['bookmakers']:
+        df = pd.DataFrame.from_dict(summary['bookmakers'], orient='index')
+        df = df.sort_values(['opportunities', 'hit_rate'], ascending=False)
+        df['hit_rate'] = df['hit_rate'].apply(lambda x: f"{x:.2%}")
+        print(df[['opportunities', 'arb_snapshots', 'quoted_snapshots', 'hit_rate']].to_string())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay stored odds snapshots through the arbitrage engine.")
+    parser.add_argument('--history', help="odds history directory (default: config.HISTORY_DIR)")
+    parser.add_argument('--csv', nargs='+', help="CSV files in the odds_data.csv layout, instead of the history")
+    parser.add_argument('--sports', help="comma-separated sport keys (default: all)")
+    parser.add_argument('--start', help="first snapshot time, e.g. 2024-01-01 or 2024-01-01T12:00Z")
+    parser.add_argument('--end', help="last snapshot time")
+    parser.add_argument('--bankroll', type=float, default=DEFAULT_BANKROLL)
+    parser.add_argument('--workers', type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument('--output', help="write one row per opportunity to this CSV")
+    args = parser.parse_args()
+
+    source = ('csv', args.csv) if args.csv else ('history', args.history)
+    sports = args.sports.split(',') if args.sports else None
+    results = run_backtest(source, sports, _timestamp(args.start), _timestamp(args.end), args.bankroll, args.workers)
+    if not results:
+        print("No snapshots found.")
+        return
+
+    print_summary(summarize(results), args.bankroll)
+    if args.output:
+        pd.DataFrame([record for result in results for record in result['opportunities']]).to_csv(args.output, index=False)
+        print(f"Opportunities written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""Benchmarks for the fetch -> flatten -> detect -> present pipeline.
+
+Generates synthetic odds payloads in the Odds API schema (see synthetic_odds.py), then times
+each hot path and records its peak traced memory. Results are written as JSON so a run can
+be compared against a saved baseline:
+
+    python benchmark.py --sizes realistic,extreme --output bench.json
+    python benchmark.py --baseline bench.json --tolerance 0.25   # exits 1 on regressions
+
+`--fetch` also times fetching every sport through a local replay server, and `--startup`
+times importing each entry module in a fresh interpreter (what a CLI run or a worker spawn
+pays before doing any work).
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from arbitrage_finder import find_arbitrage_opportunities
+from odds_flattener import flatten_odds
+from synthetic_odds import generate_odds, generate_sports
+from vectorized_arbitrage import find_arbitrage_opportunities_df
+
+# (sports, events per sport, bookmakers, markets)
+SIZES = {
+    'small': (1, 50, 5, ('h2h', 'spreads', 'totals')),
+    'realistic': (10, 15, 10, ('h2h', 'spreads', 'totals')),
+    'extreme': (1, 500, 40, ('h2h', 'spreads', 'totals')),
+}
+
+# Modules whose cold import --startup times; an empty name times the bare interpreter
+STARTUP_MODULES = ['', 'arbitrage_finder', 'parallel_scan', 'cli', 'main', 'service', 'vectorized_arbitrage']
+
+
+def build_payloads(n_sports, n_events, n_bookmakers, markets, seed=0):
+    sports = [sport['key'] for sport in generate_sports(n_sports)]
+    return {sport: generate_odds(sport, n_events, n_bookmakers, markets=markets, seed=seed) for sport in sports}
+
+
+def pipeline_stages(odds_by_sport):
+    """(name, callable) pairs for every benchmarked stage on one payload set."""
+    import main
+    import odds_api
+
+    sports = list(odds_by_sport)
+    all_events = [event for odds_data in odds_by_sport.values() for event in odds_data]
+    odds_df = flatten_odds(odds_by_sport)
+    opportunities = find_arbitrage_opportunities(all_events)
+    combined_df = main.present_data(odds_by_sport, sports, pd.DataFrame())
+
+    def csv_export():
+        with tempfile.TemporaryDirectory() as directory:
+            combined_df.to_csv(os.path.join(directory, 'odds_data.csv'), index=False)
+
+    stages = [
+        ('detect.find_arbitrage_opportunities', lambda: find_arbitrage_opportunities(all_events)),
+        ('detect.find_arbitrage_opportunities_df', lambda: find_arbitrage_opportunities_df(odds_df)),
+        ('flatten.flatten_odds', lambda: flatten_odds(odds_by_sport)),
+        ('flatten.main.present_data', lambda: main.present_data(odds_by_sport, sports, pd.DataFrame())),
+        ('flatten.odds_api.present_data',
+         lambda: odds_api.present_data(odds_by_sport, sports, ['h2h', 'spreads', 'totals'])),
+        ('present.present_opportunities', lambda: main.present_opportunities(opportunities)),
+        ('export.csv', csv_export),
+    ]
+
+    try:
+        import streamlit_arbitrage
+    except ImportError:
+        pass  # streamlit is optional for benchmarking
+    else:
+        # Outside `streamlit run`, every st.write logs a "missing ScriptRunContext" warning
+        for name in list(logging.root.manager.loggerDict):
+            if name.startswith('streamlit'):
+                logging.getLogger(name).disabled = True
+        stages.append(('flatten.streamlit_arbitrage.present_data',
+                       lambda: streamlit_arbitrage.present_data(odds_by_sport, sports, ['h2h', 'spreads', 'totals'])))
+
+    return stages, {'outcome_rows': len(odds_df), 'opportunities': len(opportunities)}
+
+
+def time_stage(func, repeat):
+    """Wall-clock timings of `repeat` runs plus the peak traced memory of one extra run."""
+    timings = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return {
+        'min_s': min(timings),
+        'median_s': statistics.median(timings),
+        'mean_s': statistics.fmean(timings),
+        'peak_memory_bytes': peak,
+    }
+
+
+def time_fetch(odds_by_sport, n_events, n_bookmakers, markets, latency, repeat):
+    """Time fetching every sport through a local replay server."""
+    import config
+    from odds_api import fetch_odds_batch
+    from replay_server import SyntheticSource, start_server
+
+    source = SyntheticSource(len(odds_by_sport), n_events, n_bookmakers)
+    server, base_url = start_server(source, port=0, latency=latency, quota=10 ** 9)
+    original_url = config.API_BASE_URL
+    config.API_BASE_URL = base_url
+    try:
+        return time_stage(lambda: list(fetch_odds_batch(list(odds_by_sport), markets=','.join(markets), use_cache=False)),
+                          repeat)
+    finally:
+        config.API_BASE_URL = original_url
+        server.shutdown()
+        server.server_close()
+
+
+def time_startup(module, repeat):
+    """Wall-clock time of `python -c "import module"` in a fresh interpreter, run from this directory."""
+    command = [sys.executable, '-c', f"import {module}" if module else 'pass']
+    directory = os.path.dirname(os.path.abspath(__file__))
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=directory, check=True, stdout=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return {'min_s': min(timings), 'median_s': statistics.median(timings), 'mean_s': statistics.fmean(timings)}
+
+
+def run_benchmarks(sizes, repeat=5, fetch=False, latency=0.0, startup=False):
+    results = []
+    if startup:
+        for module in STARTUP_MODULES:
+            stats = time_startup(module, repeat)
+            name = f"startup.import {module}" if module else 'startup.python'
+            results.append({'size': 'startup', 'stage': name, **stats})
+            print(f"{'startup':>10} {name:<45} median {stats['median_s'] * 1000:9.2f} ms", file=sys.stderr)
+    for size in sizes:
+        n_sports, n_events, n_bookmakers, markets = SIZES[size]
+        odds_by_sport = build_payloads(n_sports, n_events, n_bookmakers, markets)
+        stages, counts = pipeline_stages(odds_by_sport)
+
+        timed = []
+        if fetch:
+            timed.append(('fetch.fetch_odds_batch', time_fetch(odds_by_sport, n_events, n_bookmakers, markets, latency, repeat)))
+        timed.extend((name, time_stage(func, repeat)) for name, func in stages)
+
+        for name, stats in timed:
+            results.append({
+                'size': size,
+                'stage': name,
+                'sports': n_sports,
+                'events_per_sport': n_events,
+                'bookmakers': n_bookmakers,
+                'markets': list(markets),
+                **counts,
+                **stats,
+            })
+            print(f"{size:>10} {name:<45} median {stats['median_s'] * 1000:9.2f} ms  "
+                  f"peak {stats['peak_memory_bytes'] / 2 ** 20:8.2f} MiB", file=sys.stderr)
+    return {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def find_regressions(report, baseline, tolerance):
+    """Stages whose median time grew by more than `tolerance` (a fraction) over the baseline."""
+    previous = {(result['size'], result['stage']): result for result in baseline['results']}
+    regressions = []
+    for result in report['results']:
+        before = previous.get((result['size'], result['stage']))
+        if before and result['median_s'] > before['median_s'] * (1 + tolerance):
+            regressions.append({
+                'size': result['size'],
+                'stage': result['stage'],
+                'baseline_median_s': before['median_s'],
+                'median_s': result['median_s'],
+                'change': result['median_s'] / before['median_s'] - 1,
+            })
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the odds pipeline on synthetic payloads.")
+    parser.add_argument('--sizes', default='small,realistic', help=f"comma-separated presets: {', '.join(SIZES)}")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--fetch', action='store_true', help="also time fetching through a local replay server")
+    parser.add_argument('--latency', type=float, default=0.0, help="replay server latency per request (seconds)")
+    parser.add_argument('--startup', action='store_true', help="also time cold imports of the entry modules")
+    parser.add_argument('--output', help="write the JSON report here instead of stdout")
+    parser.add_argument('--baseline', help="JSON report to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown vs baseline (fraction)")
+    args = parser.parse_args(argv)
+
+    sizes = [size for size in args.sizes.split(',') if size]  # --sizes '' with --startup times startup only
+    report = run_benchmarks(sizes, args.repeat, args.fetch, args.latency, args.startup)
+    if args.baseline:
+        with open(args.baseline) as file:
+            report['regressions'] = find_regressions(report, json.load(file), args.tolerance)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output)
+    else:
+        print(output)
+
+    if report.get('regressions'):
+        for regression in report['regressions']:
+            print(f"Regression: {regression['size']} {regression['stage']} "
+                  f"{regression['change']:+.0%} ({regression['baseline_median_s'] * 1000:.2f} ms -> "
+                  f"{regression['median_s'] * 1000:.2f} ms)", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
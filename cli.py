@@ -0,0 +1,140 @@
+"""Command-line entry point with one subcommand per job.
+
+    python -m cli scan --sports basketball_nba,icehockey_nhl [--workers 8] [--json]
+    python -m cli export odds.csv --markets h2h,spreads,totals
+    python -m cli serve [--once]
+    python -m cli bench --sizes small --startup
+
+Sports, regions, markets and bookmakers default to config (ODDS_SPORTS etc.; with no sports
+configured every listed sport is fetched). Each command imports only what it needs, so
+`scan` from cron starts without pandas, pyarrow or streamlit and `python -m cli --help`
+costs little more than the interpreter itself.
+"""
+import argparse
+import json
+import sys
+
+import config
+
+
+def _sports(args):
+    if args.sports:
+        return [sport for sport in args.sports.split(',') if sport]
+    if config.SPORTS:
+        return list(config.SPORTS)
+    from sports_selection import fetch_sports
+    return [sport for sports in (fetch_sports() or {}).values() for sport in sports]
+
+
+def _fetch(args, decode=True):
+    """Yield (sport, odds payload) for every sport that was fetched successfully."""
+    from odds_api import fetch_odds_batch
+
+    for sport, odds_data in fetch_odds_batch(_sports(args), regions=args.regions, markets=args.markets,
+                                             odds_format=config.ODDS_FORMAT, date_format=config.DATE_FORMAT,
+                                             bookmakers=args.bookmakers, decode=decode):
+        if odds_data:
+            yield sport, odds_data
+
+
+def scan(args):
+    """Fetch once, print every arbitrage opportunity and exit 0 if any were found, 1 if none."""
+    from main import format_opportunity
+
+    if args.workers > 1:
+        from parallel_scan import ShardedArbitrageScanner
+        payloads = dict(_fetch(args, decode=False))
+        with ShardedArbitrageScanner(args.workers) as scanner:
+            opportunities = scanner.scan(payloads)
+        sports = list(payloads)
+    else:
+        from arbitrage_finder import find_arbitrage_opportunities
+        sports, opportunities = [], []
+        for sport, odds_data in _fetch(args):
+            sports.append(sport)
+            opportunities.extend(find_arbitrage_opportunities(odds_data))
+    if config.LEDGER_PATH:
+        from odds_api import market_scopes
+        from opportunity_ledger import OpportunityLedger
+        ledger = OpportunityLedger()
+        ledger.record_snapshot(opportunities, market_scopes(sports, args.markets))  # only what was fetched closes rows
+        ledger.close()
+
+    for opportunity in opportunities:
+        print(json.dumps(opportunity, default=str) if args.json else format_opportunity(opportunity))
+    if not args.json:
+        print(f"{len(opportunities)} arbitrage opportunities found.", file=sys.stderr)
+    return 0 if opportunities else 1
+
+
+def export(args):
+    """Fetch once and write the flattened odds rows (see odds_flattener) to CSV or Parquet."""
+    from odds_flattener import flatten_odds
+
+    df = flatten_odds(dict(_fetch(args)))
+    if args.path.endswith('.parquet'):
+        df.to_parquet(args.path, index=False)
+    else:
+        df.to_csv(args.path, index=False)
+    print(f"Wrote {len(df)} rows to {args.path}", file=sys.stderr)
+    return 0
+
+
+def serve(args):
+    import service
+    service.main(args.passthrough)
+    return 0
+
+
+def bench(args):
+    import benchmark
+    benchmark.main(args.passthrough)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m cli', description="Sports arbitrage scanner.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_fetch_options(command):
+        command.add_argument('--sports', help="comma-separated sport keys (default: ODDS_SPORTS, else every sport)")
+        command.add_argument('--regions', default=config.REGIONS)
+        command.add_argument('--markets', default=config.MARKETS)
+        command.add_argument('--bookmakers', default=config.BOOKMAKERS)
+
+    command = commands.add_parser('scan', help="fetch once and print arbitrage opportunities")
+    add_fetch_options(command)
+    command.add_argument('--workers', type=int, default=config.SCAN_WORKERS,
+                         help="shard detection across this many processes (see parallel_scan.py)")
+    command.add_argument('--json', action='store_true', help="print one JSON object per opportunity")
+    command.set_defaults(handler=scan)
+
+    command = commands.add_parser('export', help="fetch once and write the flattened odds to CSV or Parquet")
+    add_fetch_options(command)
+    command.add_argument('path', nargs='?', default='odds_data.csv', help="output file (.csv or .parquet)")
+    command.set_defaults(handler=export)
+
+    # serve and bench pass any further arguments on to service.py and benchmark.py
+    command = commands.add_parser('serve', help="run the polling service (options as for service.py)", add_help=False)
+    command.set_defaults(handler=serve, passthrough=True)
+
+    command = commands.add_parser('bench', help="run the benchmarks (options as for benchmark.py)", add_help=False)
+    command.set_defaults(handler=bench, passthrough=True)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if getattr(args, 'passthrough', False):
+        args.passthrough = extra
+    elif extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    if args.command in ('scan', 'export'):
+        from telemetry import setup_logging
+        setup_logging()
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""Application settings, read from the environment (and a .env file if present).
+
+This is the only module that loads .env; everything else reads its settings from here.
+"""
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _list(name, default=''):
+    return [value.strip() for value in os.getenv(name, default).split(',') if value.strip()]
+
+
+def _amounts(name, default=''):
+    """Parse "BetMGM=500,DraftKings=250" into {'BetMGM': 500.0, 'DraftKings': 250.0}."""
+    amounts = {}
+    for item in _list(name, default):
+        title, _, amount = item.rpartition('=')
+        amounts[title.strip()] = float(amount)
+    return amounts
+
+
+# Odds API key
+API_KEY = os.getenv('ODDS_API_KEY')
+
+# Root of the Odds API. Point this at a local replay server (see replay_server.py) to run offline.
+API_BASE_URL = os.getenv('ODDS_API_BASE_URL', 'https://api.the-odds-api.com').rstrip('/')
+
+# What to fetch. SPORTS is a comma-separated list of sport keys; empty means every sport the API lists.
+SPORTS = _list('ODDS_SPORTS')
+REGIONS = os.getenv('ODDS_REGIONS', 'us,us2')
+MARKETS = os.getenv('ODDS_MARKETS', 'h2h')
+ODDS_FORMAT = 'decimal'
+DATE_FORMAT = 'iso'
+
+# Bookmakers lists
+# Max bookmakers (limit 40)
+# "betfair_sb_uk,betmgm,betonlineag,betparx,betrivers,betus,betvictor,betway,bovada,boylesports,casumo,coral,draftkings,espnbet,everygame,fanduel,fliff,grosvenor,hardrockbet,ladbrokes_uk,leovegas,livescorebet,lowvig,marathonbet,matchbook,mybookieag,nordicbet,onexbet,paddypower,pointsbetus,sisportsbook,skybet,sport888,superbook,suprabets,tipico_us,virginbet,williamhill_us,windcreek,wynnbet"
+# Michigan legal bookmakers
+# "betmgm,betrivers,draftkings,fanduel,wynnbet,espnbet,sisportsbook,williamhill_us,pointsbetus,betparx"
+# Current user funded bookmakers (betparx,betrivers,espnbet to be added)
+BOOKMAKERS = os.getenv('ODDS_BOOKMAKERS', 'betmgm,draftkings,fanduel,williamhill_us')
+
+# JSON file of team name variants, {canonical name: [aliases]} (see name_table.py); empty for none
+TEAM_ALIASES_FILE = os.getenv('TEAM_ALIASES_FILE', '')
+
+# Worker processes for sharded arbitrage detection in main.py (see parallel_scan.py); 0 or 1 detects in-process
+SCAN_WORKERS = int(os.getenv('SCAN_WORKERS', 0))
+
+# Stake allocation (see stake_allocator.py), keyed by bookmaker title as it appears in opportunities:
+# available balance per funded book, optional per-bet maximum stakes and stake increments
+BOOK_BALANCES = _amounts('BOOK_BALANCES')
+BOOK_MAX_STAKES = _amounts('BOOK_MAX_STAKES')
+BOOK_INCREMENTS = _amounts('BOOK_INCREMENTS')
+STAKE_INCREMENT = float(os.getenv('STAKE_INCREMENT', 1))
+
+# Service mode (see service.py): seconds between scheduling cycles, odds requests allowed per cycle,
+# quota units never spent, and the per-sport poll interval range used by PollScheduler
+POLL_INTERVAL = float(os.getenv('POLL_INTERVAL', 60))
+POLL_BUDGET = int(os.getenv('POLL_BUDGET', 10))
+QUOTA_RESERVE = int(os.getenv('QUOTA_RESERVE', 0))
+MIN_POLL_INTERVAL = float(os.getenv('MIN_POLL_INTERVAL', 60))
+MAX_POLL_INTERVAL = float(os.getenv('MAX_POLL_INTERVAL', 3600))
+
+# Stale prices (see line_movement.py): seconds a leg may lag the freshest book quoting its market before the
+# opportunity is flagged stale, and whether service mode keeps stale opportunities off the stream
+STALE_AFTER = float(os.getenv('STALE_AFTER', 120))
+SKIP_STALE = os.getenv('SKIP_STALE', '').lower() in ('1', 'true', 'yes')
+
+# Live opportunity stream (see opportunity_stream.py): SSE port (empty disables) and an optional webhook URL.
+# STREAM_HOST is also the address the metrics server binds to.
+STREAM_HOST = os.getenv('STREAM_HOST', '127.0.0.1')
+STREAM_PORT = int(os.getenv('STREAM_PORT')) if os.getenv('STREAM_PORT') else None
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+
+# Logging and instrumentation (see telemetry.py): log level, JSON-lines log file, optional JSONL span trace
+# and Prometheus /metrics port (both empty by default, which disables them)
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FILE = os.getenv('LOG_FILE', 'error.log')
+TRACE_FILE = os.getenv('TRACE_FILE', '')
+METRICS_PORT = int(os.getenv('METRICS_PORT')) if os.getenv('METRICS_PORT') else None
+
+# Response cache (see odds_cache.py): seconds each endpoint stays fresh, and an optional disk cache directory
+SPORTS_CACHE_TTL = int(os.getenv('SPORTS_CACHE_TTL', 24 * 60 * 60))
+ODDS_CACHE_TTL = int(os.getenv('ODDS_CACHE_TTL', 30))
+CACHE_DIR = os.getenv('ODDS_CACHE_DIR')
+
+# Directory of the append-only odds history (see odds_history.py); empty disables recording
+HISTORY_DIR = os.getenv('ODDS_HISTORY_DIR', 'odds_history')
+
+# SQLite ledger of every opportunity seen (see opportunity_ledger.py); empty disables it
+LEDGER_PATH = os.getenv('LEDGER_PATH', 'opportunities.db')
@@ -0,0 +1,169 @@
+"""Stateful arbitrage scanner that re-evaluates only the markets touched by odds deltas.
+
+The scanner keeps every bookmaker's current quotes per (event, market) in memory. Feeding it
+a changed event, a single bookmaker's new prices or a removed event re-runs arbitrage
+detection for the affected markets only, and returns open/update/close change records for
+the opportunities whose state changed.
+"""
+import time
+
+from arbitrage_finder import (
+    DEFAULT_BANKROLL, MARKET_TYPES, check_arbitrage, opportunity_key, update_best_odds
+)
+from line_movement import STALE_AFTER, PriceHistory
+from market_edges import MarketEdgeIndex
+from name_table import team_names
+from telemetry import span
+
+
+def opportunity_change(change_type, opportunity):
+    """Build an 'open', 'update' or 'close' change record."""
+    return {'type': change_type, 'key': opportunity_key(opportunity), 'opportunity': opportunity}
+
+
+class IncrementalArbitrageScanner:
+    def __init__(self, bankroll=DEFAULT_BANKROLL, stale_after=STALE_AFTER):
+        self.bankroll = bankroll
+        self.events = {}         # event_id -> {'event_name', 'sport'}
+        self.quotes = {}         # (event_id, market_type) -> {bookmaker: outcomes}
+        self.opportunities = {}  # (event_id, market_type) -> {opportunity_key: opportunity}
+        self.edge_index = MarketEdgeIndex()  # every market's implied-probability sums, for near-arbs and middles
+        self.movement = PriceHistory(stale_after=stale_after)  # recent prices per (event, book, market), for staleness and velocity
+
+    def apply_snapshot(self, odds_data, sport=None):
+        """Apply a full odds payload for one sport, removing that sport's events that are no longer listed."""
+        changes = []
+        seen = set()
+        with span('detect', engine='incremental'):
+            for event in odds_data:
+                seen.add(event['id'])
+                changes.extend(self.update_event(event))
+
+            sport_keys = {sport} if sport else {event.get('sport_key') for event in odds_data}
+            stale = [event_id for event_id, info in self.events.items()
+                     if info['sport'] in sport_keys and event_id not in seen]
+            for event_id in stale:
+                changes.extend(self.remove_event(event_id))
+        return changes
+
+    def update_event(self, event):
+        """Replace an event's quotes with the bookmakers in `event`, re-evaluating only markets that changed."""
+        event_id = event['id']
+        teams = team_names.event_teams(event)
+        self.movement.record_event(event)
+        self.events[event_id] = {
+            'event_name': team_names.event_name(event, teams),
+            'teams': teams,
+            'sport': event.get('sport_key')
+        }
+
+        new_quotes = {market_type: {} for market_type in MARKET_TYPES}
+        for bookmaker in event.get('bookmakers', []):
+            for market in bookmaker.get('markets', []):
+                if market['key'] in new_quotes:
+                    new_quotes[market['key']][bookmaker['title']] = market.get('outcomes', [])
+
+        changes = []
+        for market_type, quotes in new_quotes.items():
+            market = (event_id, market_type)
+            if self.quotes.get(market, {}) != quotes:
+                if quotes:
+                    self.quotes[market] = quotes
+                else:
+                    self.quotes.pop(market, None)
+                changes.extend(self._evaluate(market))
+            elif market in self.opportunities:
+                changes.extend(self._rescore(market))  # same prices, but last_update may have moved
+        return changes
+
+    def update_prices(self, event_id, bookmaker, market_type, outcomes, updated_at=None):
+        """Apply one bookmaker's new outcomes for a market; empty `outcomes` withdraws the bookmaker's quote.
+
+        `updated_at` is the quote's last_update as a POSIX timestamp (default: now).
+        """
+        if event_id not in self.events or market_type not in MARKET_TYPES:
+            return []
+        if outcomes:
+            self.movement.record(event_id, bookmaker, market_type, outcomes,
+                                 time.time() if updated_at is None else updated_at, self.events[event_id]['sport'])
+        market = (event_id, market_type)
+        quotes = self.quotes.get(market, {})
+        if outcomes:
+            if quotes.get(bookmaker) == outcomes:
+                return self._rescore(market)
+            self.quotes.setdefault(market, {})[bookmaker] = outcomes
+        else:
+            if bookmaker not in quotes:
+                return []
+            del quotes[bookmaker]
+            if not quotes:
+                del self.quotes[market]
+        return self._evaluate(market)
+
+    def remove_event(self, event_id):
+        """Drop an event and close any opportunities it had open."""
+        if self.events.pop(event_id, None) is None:
+            return []
+        self.edge_index.remove_event(event_id)
+        self.movement.forget_event(event_id)
+        changes = []
+        for market_type in MARKET_TYPES:
+            market = (event_id, market_type)
+            self.quotes.pop(market, None)
+            for opportunity in self.opportunities.pop(market, {}).values():
+                changes.append(opportunity_change('close', opportunity))
+        return changes
+
+    def current_opportunities(self):
+        """All currently open opportunities."""
+        return [opportunity for market in self.opportunities.values() for opportunity in market.values()]
+
+    def _rescore(self, market):
+        """Refresh the staleness scores of a market's open opportunities after an update with unchanged prices.
+
+        Books reporting a newer last_update can make a leg stale or fresh again without any price
+        moving; an 'update' is emitted only when the `stale` flag flips, so routine timestamp
+        advances do not flood the stream.
+        """
+        event_id, market_type = market
+        open_opportunities = self.opportunities.get(market, {})
+        changes = []
+        for key, opportunity in open_opportunities.items():
+            legs = [dict(leg) for leg in opportunity['legs']]
+            scores = self.movement.score(event_id, market_type, legs)
+            open_opportunities[key] = {**opportunity, **scores, 'legs': legs}
+            if scores['stale'] != opportunity.get('stale'):
+                changes.append(opportunity_change('update', open_opportunities[key]))
+        return changes
+
+    def _evaluate(self, market):
+        """Re-run detection for one market and diff the result against its open opportunities."""
+        event_id, market_type = market
+        event = self.events[event_id]
+
+        best_odds = {}
+        for bookmaker, outcomes in self.quotes.get(market, {}).items():
+            update_best_odds(best_odds, bookmaker, outcomes, team_names, event['teams'])
+        self.edge_index.update_market(event_id, market_type, best_odds, event['event_name'], event['sport'],
+                                      event['teams'])
+        found = []
+        if len(best_odds) >= 2:
+            found = check_arbitrage(event['event_name'], market_type, best_odds, self.bankroll,
+                                    event_id=event_id, sport=event['sport'], movement=self.movement,
+                                    teams=event['teams'])
+
+        previous = self.opportunities.pop(market, {})
+        current = {opportunity_key(opportunity): opportunity for opportunity in found}
+        changes = []
+        for key, opportunity in current.items():
+            if key not in previous:
+                changes.append(opportunity_change('open', opportunity))
+            elif previous[key] != opportunity:
+                changes.append(opportunity_change('update', opportunity))
+        for key, opportunity in previous.items():
+            if key not in current:
+                changes.append(opportunity_change('close', opportunity))
+
+        if current:
+            self.opportunities[market] = current
+        return changes
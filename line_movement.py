@@ -0,0 +1,155 @@
+"""Recent price history per (event, bookmaker, market), for staleness and velocity scoring.
+
+The Odds API stamps every bookmaker market with `last_update`. `PriceHistory` keeps, per
+(event_id, bookmaker title, market type), a ring buffer (`collections.deque` with a
+maximum length) of the last few distinct price sets with their update times, so memory
+stays bounded however long the service runs; events are dropped once they leave a sport's
+payload.
+
+Two scores come out of it:
+- staleness: how far a book's last update lags the freshest book quoting the same market.
+  Many apparent arbs are one book that has not moved yet; an opportunity with a leg more
+  than `stale_after` seconds behind is flagged `stale`.
+- velocity: total movement of the implied probabilities, in percentage points per minute,
+  across the buffer. PollScheduler uses the fastest market of a sport to poll it sooner.
+
+Passing a PriceHistory to find_arbitrage_opportunities (or using the scanner's) attaches
+`stale_seconds`, `velocity` and `stale` to each opportunity and `last_update` and
+`stale_seconds` to each leg.
+"""
+import functools
+from collections import deque
+
+from poll_scheduler import parse_commence_time
+
+DEFAULT_DEPTH = 16  # price sets kept per (event, bookmaker, market)
+STALE_AFTER = 120  # seconds a leg may lag the market's freshest update before the arb is flagged
+
+
+class PriceHistory:
+    def __init__(self, depth=DEFAULT_DEPTH, stale_after=STALE_AFTER):
+        self.depth = depth
+        self.stale_after = stale_after
+        # Keyed by (event_id, bookmaker, market_type):
+        self.series = {}   # deque of (updated_at, {(name, point): price}, movement since the previous entry)
+        self.moved = {}    # movement summed over the buffer (every entry but the first)
+        self.updated = {}  # latest last_update timestamp
+        self.markets = {}  # (event_id, market_type) -> {bookmaker}
+        self.sports = {}   # event_id -> sport_key
+        self._sport_velocity = {}  # sport_key -> cached sport_velocity, dropped when the sport records prices
+
+    def record(self, event_id, bookmaker, market_type, outcomes, updated_at, sport=None):
+        """Record one bookmaker's prices for a market as of `updated_at` (a POSIX timestamp)."""
+        key = (event_id, bookmaker, market_type)
+        if updated_at is not None and updated_at <= self.updated.get(key, updated_at - 1):
+            return  # unchanged since the last poll, or an older response arriving late
+        prices = {(outcome['name'], outcome.get('point')): outcome['price'] for outcome in outcomes}
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = deque(maxlen=self.depth)
+            self.moved[key] = 0.0
+            self.markets.setdefault((event_id, market_type), set()).add(bookmaker)
+        if not series:
+            series.append((updated_at, prices, 0.0))
+        elif series[-1][1] != prices:
+            moved = _movement(series[-1][1], prices)
+            if len(series) == series.maxlen:
+                self.moved[key] -= series[1][2]  # the oldest entry drops out, and with it the move into series[1]
+            series.append((updated_at, prices, moved))
+            self.moved[key] += moved
+        if updated_at is not None:
+            self.updated[key] = updated_at
+        if sport is not None:
+            self.sports[event_id] = sport
+        self._sport_velocity.pop(self.sports.get(event_id), None)
+
+    def record_event(self, event):
+        """Record every bookmaker market of an API event."""
+        event_id, sport = event.get('id'), event.get('sport_key')
+        for bookmaker in event.get('bookmakers', []):
+            for market in bookmaker.get('markets', []):
+                updated_at = _timestamp(market.get('last_update') or bookmaker.get('last_update'))
+                self.record(event_id, bookmaker['title'], market['key'], market.get('outcomes', []), updated_at, sport)
+
+    def record_payload(self, odds_data, sport=None):
+        """Record a full payload for one sport, forgetting that sport's events it no longer lists."""
+        seen = set()
+        for event in odds_data:
+            seen.add(event.get('id'))
+            self.record_event(event)
+        sports = {sport} if sport else {event.get('sport_key') for event in odds_data}
+        for event_id in [event_id for event_id, event_sport in self.sports.items()
+                         if event_sport in sports and event_id not in seen]:
+            self.forget_event(event_id)
+
+    def forget_event(self, event_id):
+        self._sport_velocity.pop(self.sports.pop(event_id, None), None)
+        for market in [market for market in self.markets if market[0] == event_id]:
+            for bookmaker in self.markets.pop(market):
+                key = (event_id, bookmaker, market[1])
+                self.series.pop(key, None)
+                self.moved.pop(key, None)
+                self.updated.pop(key, None)
+
+    def last_update(self, event_id, bookmaker, market_type):
+        return self.updated.get((event_id, bookmaker, market_type))
+
+    def velocity(self, event_id, bookmaker, market_type):
+        """Implied-probability movement of one book's market, in percentage points per minute."""
+        key = (event_id, bookmaker, market_type)
+        series = self.series.get(key)
+        if not series or len(series) < 2:
+            return 0.0
+        first, last = series[0][0], self.updated.get(key)
+        minutes = (last - first) / 60 if first is not None and last is not None else 0.0
+        return self.moved[key] / minutes if minutes > 0 else 0.0
+
+    def market_velocity(self, event_id, market_type):
+        """Fastest-moving book's velocity in one market."""
+        return max((self.velocity(event_id, bookmaker, market_type)
+                    for bookmaker in self.markets.get((event_id, market_type), ())), default=0.0)
+
+    def sport_velocity(self, sport):
+        """Fastest market velocity across a sport's events, used to steer polling."""
+        velocity = self._sport_velocity.get(sport)
+        if velocity is None:
+            velocity = self._sport_velocity[sport] = max(
+                (self.velocity(*key) for key in self.series if self.sports.get(key[0]) == sport), default=0.0)
+        return velocity
+
+    def freshest_update(self, event_id, market_type):
+        updates = [self.updated[(event_id, bookmaker, market_type)]
+                   for bookmaker in self.markets.get((event_id, market_type), ())
+                   if (event_id, bookmaker, market_type) in self.updated]
+        return max(updates, default=None)
+
+    def score(self, event_id, market_type, legs):
+        """Annotate `legs` with last_update/stale_seconds and return the opportunity-level scores."""
+        freshest = self.freshest_update(event_id, market_type)
+        stale_seconds = velocity = 0.0
+        for leg in legs:
+            updated_at = self.last_update(event_id, leg['bookmaker'], market_type)
+            leg['last_update'] = updated_at
+            leg['stale_seconds'] = freshest - updated_at if updated_at is not None and freshest is not None else None
+            stale_seconds = max(stale_seconds, leg['stale_seconds'] or 0.0)
+            velocity = max(velocity, self.velocity(event_id, leg['bookmaker'], market_type))
+        return {'stale_seconds': stale_seconds, 'velocity': velocity, 'stale': stale_seconds > self.stale_after}
+
+
+# The same few last_update strings repeat across a payload's books and markets
+_timestamp = functools.lru_cache(maxsize=4096)(parse_commence_time)
+
+
+def _movement(before, after):
+    """Summed change in implied probability (percentage points) between two price sets of one market."""
+    moved = 0.0
+    for outcome, price in after.items():
+        previous = before.get(outcome)
+        if price and previous:
+            moved += abs(100 / price - 100 / previous)
+    return moved
+
+
+def fresh_opportunities(opportunities):
+    """Opportunities not flagged stale by a PriceHistory (unscored ones are kept)."""
+    return [opportunity for opportunity in opportunities if not opportunity.get('stale')]
@@ -1,69 +1,88 @@
-from dotenv import load_dotenv
-import os
-from odds_api import fetch_odds, log_error
+from odds_api import decode_json, fetch_odds_batch, market_scopes
 from arbitrage_finder import find_arbitrage_opportunities
 from sports_selection import fetch_sports, user_select_sports
-import pandas as pd
+from parallel_scan import ShardedArbitrageScanner
+from stake_allocator import allocate_stakes
+from telemetry import setup_logging, span, timed
+import config
 
-# Load environment variables from .env file
-load_dotenv()
-
-# Access the API key
-API_KEY = os.getenv('ODDS_API_KEY')
+# pandas (and odds_flattener/odds_history, which need it) and the ledger are imported inside the functions that
+# use them, so service.py and cli.py can import the formatting helpers here without loading pandas.
 
+@timed('present', view='main.present_data')
 def present_data(odds_data, selected_sports, combined_df):
-    flattened_data = []
-
-    for sport_key in selected_sports:
-        for event in odds_data.get(sport_key, []):
-            event_id = event.get('id')
-            event_name = f"{event.get('home_team')} vs {event.get('away_team')}"
-            for bookmaker in event.get('bookmakers', []):
-                bookmaker_name = bookmaker.get('title')
-                for market in bookmaker.get('markets', []):
-                    market_key = market.get('key')
-                    if market_key in ['h2h']: # , 'spreads', 'totals'
-                        for outcome in market.get('outcomes', []):
-                            data = {
-                                'sport': sport_key,
-                                'event_id': event_id,
-                                'event_name': event_name,
-                                'bookmaker': bookmaker_name,
-                                'market_type': market_key,
-                                'team': outcome.get('name'),
-                                'price': outcome.get('price'),
-                                'point': outcome.get('point', None)  # None if not applicable
-                            }
-                            flattened_data.append(data)
+    import pandas as pd
+    from odds_flattener import flatten_odds
 
-    df = pd.DataFrame(flattened_data)
+    df = flatten_odds({sport_key: odds_data.get(sport_key, []) for sport_key in selected_sports},
+                      markets=['h2h'])  # , 'spreads', 'totals'
     if combined_df.empty:
-        combined_df = df.copy()
-    else:
-        combined_df = pd.concat([combined_df, df], ignore_index=True, sort=False)
-    return combined_df
+        return df
+    return pd.concat([combined_df, df], ignore_index=True, sort=False)
+
+def format_stakes(legs):
+    """Format the stake on each leg of an opportunity, e.g. "Draw 21.73 @ 4.66 (FanDuel)"."""
+    return '; '.join(f"{leg['outcome']} {leg['stake']:.2f} @ {leg['odds']} ({leg['bookmaker']})" for leg in legs)
+
+def format_opportunity(opportunity, stakes=True):
+    """One line per opportunity, e.g. "basketball_nba | A vs B | h2h A vs B | 98.40% | A 51.2 @ 1.95 (...); ..."."""
+    line = (f"{opportunity['sport']} | {opportunity['event_name']} | "
+            f"{opportunity['market_type']} {opportunity['outcome_name']} | {opportunity['arb_percentage']:.2f}%")
+    if stakes:
+        line += f" | {format_stakes(opportunity['legs'])}"
+        if opportunity.get('stale'):
+            line += f" | stale {opportunity['stale_seconds']:.0f}s"
+    return line
 
+@timed('present', view='main.present_opportunities')
 def present_opportunities(opportunities):
+    import pandas as pd
+
     if not opportunities:
         print("No arbitrage opportunities found.")
         return
     df = pd.DataFrame(opportunities)
     if not df.empty:
         df['arb_percentage'] = df['arb_percentage'].apply(lambda x: f"{x:.2f}%")
-    for column in ['event_name', 'market_type', 'outcome_name', 'point', 'bookmaker', 'odds', 'comparison_bookmaker', 'comparison_odds', 'arb_percentage']:
+        if 'legs' in df.columns:
+            df['stakes'] = df['legs'].apply(format_stakes)
+        if 'profit' in df.columns:
+            df['profit'] = df['profit'].apply(lambda x: f"{x:.2f}")
+    for column in ['event_name', 'market_type', 'outcome_name', 'point', 'bookmaker', 'odds', 'comparison_bookmaker', 'comparison_odds', 'arb_percentage', 'stakes', 'profit']:
         if column not in df.columns:
             df[column] = 'N/A'
     df['point'] = df['point'].fillna('N/A')
-    columns_order = ['event_name', 'market_type', 'outcome_name', 'point', 'bookmaker', 'odds', 'comparison_bookmaker', 'comparison_odds', 'arb_percentage']
+    columns_order = ['event_name', 'market_type', 'outcome_name', 'point', 'bookmaker', 'odds', 'comparison_bookmaker', 'comparison_odds', 'arb_percentage', 'stakes', 'profit']
     df = df[columns_order]
     print(df.to_string(index=False))
 
+@timed('present', view='main.present_allocations')
+def present_allocations(allocations, remaining):
+    """Print the stake plan from stake_allocator.allocate_stakes and what is left in each book."""
+    import pandas as pd
+
+    if not allocations:
+        print("No opportunities could be funded from the configured balances.")
+        return
+    df = pd.DataFrame({
+        'event_name': [allocation['opportunity']['event_name'] for allocation in allocations],
+        'market_type': [allocation['opportunity']['market_type'] for allocation in allocations],
+        'stakes': [format_stakes(allocation['legs']) for allocation in allocations],
+        'total_stake': [f"{allocation['total_stake']:.2f}" for allocation in allocations],
+        'guaranteed_profit': [f"{allocation['guaranteed_profit']:.2f}" for allocation in allocations],
+    })
+    print(df.to_string(index=False))
+    print(f"Total guaranteed profit: {sum(allocation['guaranteed_profit'] for allocation in allocations):.2f}")
+    print("Remaining balances: " + ', '.join(f"{bookmaker} {amount:.2f}" for bookmaker, amount in remaining.items()))
+
 def main():
-    # Clear the error.log and odds_data.csv file before running the script
-    with open('error.log', 'w') as file:
-        file.write('')
+    # Clear the log file (LOG_FILE, error.log by default) and odds_data.csv before running the script
+    if config.LOG_FILE:
+        with open(config.LOG_FILE, 'w') as file:
+            file.write('')
     with open('odds_data.csv', 'w') as file:
         file.write('')
+    setup_logging()
     
     # Fetch and categorize sports
     categorized_sports = fetch_sports()
@@ -79,36 +98,35 @@ def main():
     
     print(f"Selected sports for odds fetching: {selected_sports}")
     
-    # Initialize an empty DataFrame to hold data for all sports
-    combined_df = pd.DataFrame()
+    # Odds payloads for every sport fetched this run, flattened once after the loop
+    fetched_odds = {}
+    
+    # Every fetch is also kept as a snapshot in the odds history
+    history = None
+    if config.HISTORY_DIR:
+        from odds_history import OddsHistoryStore
+        history = OddsHistoryStore()
     
     # List to store all found arbitrage opportunities
     all_opportunities = []
     
-    # Fetch odds for selected sports and find arbitrage opportunities
-    for sport_key in selected_sports:
-        print(f"Fetching odds for {sport_key}...")
-        # define regions
-        regions = 'us,us2'
-        markets = 'h2h' # ,'totals'
-        odds_format = 'decimal'
-        date_format = 'iso'
-        
-        # Bookmakers lists
-        # Max bookmakers (limit 40)
-        # bookmakers_list = "betfair_sb_uk,betmgm,betonlineag,betparx,betrivers,betus,betvictor,betway,bovada,boylesports,casumo,coral,draftkings,espnbet,everygame,fanduel,fliff,grosvenor,hardrockbet,ladbrokes_uk,leovegas,livescorebet,lowvig,marathonbet,matchbook,mybookieag,nordicbet,onexbet,paddypower,pointsbetus,sisportsbook,skybet,sport888,superbook,suprabets,tipico_us,virginbet,williamhill_us,windcreek,wynnbet"
-        
-        # Michigan legal bookmakers
-        # bookmakers_list = "betmgm,betrivers,draftkings,fanduel,wynnbet,espnbet,sisportsbook,williamhill_us,pointsbetus,betparx"
-        
-        # Current user funded bookmakers
-        bookmakers_list = "betmgm,draftkings,fanduel,williamhill_us" ## betparx,betrivers,espnbet to be added
-        
-        # Fetch odds data
-        odds_data = fetch_odds(sport=sport_key, regions=regions, markets='h2h', odds_format=odds_format, date_format=date_format, bookmakers=bookmakers_list)
- 
-        if odds_data:
-            combined_df = present_data({sport_key: odds_data}, selected_sports, combined_df)
+    # With SCAN_WORKERS, raw response bodies are kept and detection is sharded across processes after the fetch;
+    # the bodies are decoded here (for history and the CSV) only while the workers run
+    scanner = ShardedArbitrageScanner(config.SCAN_WORKERS) if config.SCAN_WORKERS > 1 else None
+    raw_odds = {}
+    
+    # Fetch odds for all selected sports concurrently and find arbitrage opportunities as each sport arrives
+    # (regions, markets and bookmakers come from config)
+    print(f"Fetching odds for {len(selected_sports)} sports...")
+    for sport_key, odds_data in fetch_odds_batch(selected_sports, regions=config.REGIONS, markets=config.MARKETS,
+                                                 odds_format=config.ODDS_FORMAT, date_format=config.DATE_FORMAT,
+                                                 bookmakers=config.BOOKMAKERS, decode=scanner is None):
+        if odds_data and scanner:
+            raw_odds[sport_key] = odds_data
+        elif odds_data:
+            fetched_odds[sport_key] = odds_data
+            if history:
+                history.append_snapshot(sport_key, odds_data)
             opportunities = find_arbitrage_opportunities(odds_data)
             if opportunities:
                 print(f"Arbitrage Opportunities Found for {sport_key}:")
@@ -117,14 +135,45 @@ def main():
             else:
                 print(f"No arbitrage opportunities found for {sport_key}.")
     
+    if scanner:
+        # Timed from submit to result, so the decoding and history writes overlapping the workers count too
+        with scanner, span('detect', engine='sharded'):
+            job = scanner.submit(raw_odds)
+            for sport_key, body in raw_odds.items():
+                with span('decode', sport=sport_key):
+                    fetched_odds[sport_key] = odds_data = decode_json(body)
+                if history:
+                    history.append_snapshot(sport_key, odds_data)
+            all_opportunities = job.result()
+        for sport_key in raw_odds:
+            opportunities = [opportunity for opportunity in all_opportunities if opportunity['sport'] == sport_key]
+            if opportunities:
+                print(f"Arbitrage Opportunities Found for {sport_key}:")
+                present_opportunities(opportunities)
+            else:
+                print(f"No arbitrage opportunities found for {sport_key}.")
+    
     # Write the combined DataFrame to a single CSV file after processing all sports
+    import pandas as pd
+    combined_df = present_data(fetched_odds, list(fetched_odds), pd.DataFrame())
     combined_df.to_csv('odds_data.csv', index=False)
     print("All sports data has been written to odds_data.csv")
     
+    # Every opportunity is also kept in the ledger; the sports and markets fetched close their unseen rows
+    if config.LEDGER_PATH:
+        from opportunity_ledger import OpportunityLedger
+        ledger = OpportunityLedger()
+        ledger.record_snapshot(all_opportunities, market_scopes(fetched_odds, config.MARKETS))
+        ledger.close()
+    
     # Display all arbitrage opportunities found
     if all_opportunities:
         print("\nArbitrage Opportunities Found:")
         present_opportunities(all_opportunities)
+        if config.BOOK_BALANCES:
+            print("\nSuggested stakes for the funded bookmakers:")
+            present_allocations(*allocate_stakes(all_opportunities, config.BOOK_BALANCES, config.BOOK_MAX_STAKES,
+                                                 config.BOOK_INCREMENTS, config.STAKE_INCREMENT))
     else:
         print("No arbitrage opportunities were found across all sports.")
 
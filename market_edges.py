@@ -0,0 +1,185 @@
+"""Sorted index of every market's implied-probability sum, for near-arb and middle queries.
+
+Arbitrage detection evaluates every market's best prices anyway; feeding them to a
+MarketEdgeIndex (find_arbitrage_opportunities(..., edge_index=index) or
+IncrementalArbitrageScanner.edge_index) keeps, per event and market, the sum of implied
+probabilities of each h2h/outrights market and each spreads/totals line. The entries are
+sorted once, on the first query after a scan changed them, and "top-K tightest markets" and
+"everything within X% of an arb" are then slices of that list.
+
+Middles are kept the same way: for totals, the best Over at a low total with the best Under
+at a higher one; for spreads, the best price on one team at a line with the other team at a
+line that leaves a window where both bets win (e.g. A -3.5 and B +5.5 both win if A wins
+by 4 or 5).
+
+Events that drop out of a sport's payload (finished games) are pruned: the dict engine does
+it for the sports in each payload it scans, and the scanner on apply_snapshot. In service
+mode the stream server answers `GET /near-arbs?margin=1.0` from the scanner's index.
+"""
+import bisect
+import itertools
+import threading
+
+from arbitrage_finder import N_WAY_MARKETS, calculate_arbitrage_percentage, index_market_lines
+
+
+def _leg(key, odds):
+    return {'outcome': key[0], 'point': key[1], 'bookmaker': odds['bookmaker'], 'odds': odds['odds']}
+
+
+def market_edges(market_type, best_odds, teams=()):
+    """(line, arb_percentage, legs) for each complete market or line in `best_odds`; line is None for N-way markets."""
+    if market_type in N_WAY_MARKETS:
+        if len(best_odds) < 2:
+            return []
+        arb_percentage = calculate_arbitrage_percentage(*(odds['odds'] for odds in best_odds.values()))
+        return [(None, arb_percentage, [_leg(key, odds) for key, odds in best_odds.items()])]
+    edges = []
+    for line, sides in index_market_lines(market_type, best_odds, teams).items():
+        if len(sides) == 2:
+            keys = list(sides.values())
+            arb_percentage = calculate_arbitrage_percentage(*(best_odds[key]['odds'] for key in keys))
+            edges.append((line, arb_percentage, [_leg(key, best_odds[key]) for key in keys]))
+    return edges
+
+
+def market_middles(market_type, best_odds, teams=()):
+    """(low, high, arb_percentage, legs) for every pair of opposite sides that both win inside (low, high).
+
+    Spread sides are identified by `teams` (the event's canonical (home, away)) as in
+    arbitrage_finder.index_market_lines; outcomes naming neither team are skipped.
+    """
+    if market_type not in ('spreads', 'totals'):
+        return []
+    # Express both sides as thresholds on one number: the total, or the home team's winning margin.
+    # An "over" side wins above its threshold and an "under" side wins below it.
+    overs, unders = [], []
+    home, away = teams if teams else (None, None)
+    for key, odds in best_odds.items():
+        name, point = key
+        if point is None:
+            continue
+        if market_type == 'totals':
+            (overs if name == 'Over' else unders).append((point, key, odds))
+        else:
+            if home is None:
+                home = name
+            elif away is None and name != home:
+                away = name
+            if name == home:
+                overs.append((-point, key, odds))  # e.g. -3.5 covers with a margin above 3.5
+            elif name == away:
+                unders.append((point, key, odds))  # e.g. +5.5 covers with a margin below 5.5
+    middles = []
+    for (low, over_key, over_odds), (high, under_key, under_odds) in itertools.product(overs, unders):
+        if low < high:
+            arb_percentage = calculate_arbitrage_percentage(over_odds['odds'], under_odds['odds'])
+            middles.append((low, high, arb_percentage, [_leg(over_key, over_odds), _leg(under_key, under_odds)]))
+    return middles
+
+
+class SortedEntries:
+    """Records ordered by arb_percentage, replaceable per (event_id, market_type).
+
+    Replacing a market only swaps its records; the sorted order is rebuilt with one sort on
+    the next query after any change, so a scan touching every market costs O(n log n) once
+    instead of an O(n) list insertion or deletion per entry.
+    """
+
+    def __init__(self):
+        self._by_market = {}  # (event_id, market_type) -> [record]
+        self._order = None    # every record sorted by arb_percentage; None when stale
+        self._keys = None     # arb_percentage of each record in _order, for bisect
+
+    def __len__(self):
+        return sum(len(records) for records in self._by_market.values())
+
+    def replace(self, market, records):
+        if records:
+            self._by_market[market] = list(records)
+        else:
+            self._by_market.pop(market, None)
+        self._order = None
+
+    def remove(self, market):
+        if self._by_market.pop(market, None) is not None:
+            self._order = None
+
+    def _sorted(self):
+        if self._order is None:
+            self._order = sorted((record for records in self._by_market.values() for record in records),
+                                 key=lambda record: record['arb_percentage'])
+            self._keys = [record['arb_percentage'] for record in self._order]
+        return self._order
+
+    def first(self, count):
+        return self._sorted()[:count]
+
+    def below(self, arb_percentage):
+        order = self._sorted()
+        return order[:bisect.bisect_left(self._keys, arb_percentage)]
+
+    def markets(self):
+        return list(self._by_market)
+
+
+class MarketEdgeIndex:
+    def __init__(self):
+        self.edges = SortedEntries()
+        self.middles = SortedEntries()
+        self.event_markets = {}  # event_id -> {market_type} indexed
+        self.event_sports = {}   # event_id -> sport_key
+        self._lock = threading.Lock()  # the service updates the index while the stream server queries it
+
+    def update_market(self, event_id, market_type, best_odds, event_name=None, sport=None, teams=()):
+        """Replace one event market's entries with those computed from its current best odds."""
+        market = (event_id, market_type)
+        base = {'sport': sport, 'event_id': event_id, 'event_name': event_name, 'market_type': market_type}
+        edges = [dict(base, line=line, arb_percentage=arb_percentage, legs=legs)
+                 for line, arb_percentage, legs in market_edges(market_type, best_odds, teams)]
+        middles = [dict(base, low=low, high=high, width=high - low, arb_percentage=arb_percentage, legs=legs)
+                   for low, high, arb_percentage, legs in market_middles(market_type, best_odds, teams)]
+        with self._lock:
+            self.edges.replace(market, edges)
+            self.middles.replace(market, middles)
+            self.event_markets.setdefault(event_id, set()).add(market_type)
+            if sport is not None:
+                self.event_sports[event_id] = sport
+
+    def remove_event(self, event_id):
+        with self._lock:
+            self._remove_event(event_id)
+
+    def _remove_event(self, event_id):
+        self.event_sports.pop(event_id, None)
+        for market_type in self.event_markets.pop(event_id, ()):
+            self.edges.remove((event_id, market_type))
+            self.middles.remove((event_id, market_type))
+
+    def prune(self, sports, event_ids):
+        """Remove the events of `sports` that are not in `event_ids`, i.e. no longer in their payloads."""
+        with self._lock:
+            for event_id in [event_id for event_id, sport in self.event_sports.items()
+                             if sport in sports and event_id not in event_ids]:
+                self._remove_event(event_id)
+
+    def tightest(self, count=10):
+        """The `count` markets/lines with the lowest implied-probability sum (arbs first)."""
+        with self._lock:
+            return self.edges.first(count)
+
+    def within(self, margin=1.0):
+        """Markets/lines whose implied-probability sum is below 100 + `margin` percent, tightest first."""
+        with self._lock:
+            return self.edges.below(100 + margin)
+
+    def near_arbs(self, margin=1.0):
+        """Markets/lines between 100% and 100 + `margin` percent: not arbs, but close."""
+        return [edge for edge in self.within(margin) if edge['arb_percentage'] >= 100]
+
+    def middle_windows(self, max_arb_percentage=float('inf'), min_width=0.0):
+        """Middles cheapest first, limited to an implied-probability sum and a minimum window width."""
+        with self._lock:
+            middles = (self.middles.below(max_arb_percentage) if max_arb_percentage != float('inf')
+                       else self.middles.first(None))
+        return [middle for middle in middles if middle['width'] >= min_width]
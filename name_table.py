@@ -0,0 +1,125 @@
+"""Canonical, interned team, bookmaker and event names.
+
+Bookmakers do not always spell a team the same way ("LA Clippers" / "Los Angeles
+Clippers", "St. Louis Blues" / "St Louis Blues"). `NameTable.canonical` maps a raw name to
+one canonical spelling by, in order: the alias map, an exact match against the event's own
+teams, a normalized-spelling match against every canonical name seen so far, and finally a
+fuzzy match limited to the event's teams. Results are cached by input, so after the first
+sighting a name costs one dict lookup.
+
+Canonical names are interned (`sys.intern`) and numbered, so dictionary keys built from them
+hash and compare by identity in the detection loops, and `id_of`/`name_of` give compact
+integer IDs where a caller wants them.
+
+Aliases are read from a JSON file (config.TEAM_ALIASES_FILE) mapping each canonical name to
+its variants:
+
+    {"Los Angeles Clippers": ["LA Clippers", "L.A. Clippers"]}
+"""
+import difflib
+import json
+import re
+import sys
+
+import config
+
+FUZZY_CUTOFF = 0.85  # minimum difflib similarity for a fuzzy match
+FUZZY_MARGIN = 0.05  # the best candidate must beat the runner-up by this much
+CACHE_LIMIT = 100_000  # lookups cached before the cache is reset
+GENERIC_OUTCOMES = ('Draw', 'Over', 'Under')
+
+
+def normalize(name):
+    """Spelling-insensitive form of a name: case-folded, punctuation dropped, whitespace collapsed."""
+    return ' '.join(re.sub(r"[^\w\s]", ' ', name.casefold()).split())
+
+
+class NameTable:
+    def __init__(self, aliases=None):
+        self.names = []        # id -> canonical name
+        self.ids = {}          # canonical name -> id
+        self.aliases = {}      # alias -> canonical name
+        self._normalized = {}  # normalized spelling -> canonical name
+        self._cache = {}       # (raw name, candidates) -> canonical name
+        for name in GENERIC_OUTCOMES:
+            self.intern(name)
+        for canonical, variants in (aliases or {}).items():
+            self.add_alias(canonical, variants)
+
+    def intern(self, name):
+        """Register `name` as canonical and return its interned string."""
+        name = sys.intern(name)
+        if name not in self.ids:
+            self.ids[name] = len(self.names)
+            self.names.append(name)
+            self._normalized.setdefault(normalize(name), name)
+        return name
+
+    def add_alias(self, canonical, variants):
+        canonical = self.intern(canonical)
+        for variant in variants:
+            self.aliases[variant] = canonical
+            self._normalized.setdefault(normalize(variant), canonical)
+        self._cache.clear()
+
+    def id_of(self, name, candidates=()):
+        return self.ids[self.canonical(name, candidates)]
+
+    def name_of(self, name_id):
+        return self.names[name_id]
+
+    def canonical(self, name, candidates=()):
+        """Canonical spelling of `name`; `candidates` (the event's canonical team names) enable fuzzy matching."""
+        if name is None:
+            return None
+        key = (name, candidates)
+        canonical = self._cache.get(key)
+        if canonical is None:
+            if len(self._cache) >= CACHE_LIMIT:
+                self._cache.clear()
+            canonical = self._cache[key] = self._resolve(name, candidates)
+        return canonical
+
+    def _resolve(self, name, candidates):
+        if name in self.aliases:
+            return self.aliases[name]
+        if name in self.ids:
+            return self.names[self.ids[name]]
+        known = self._normalized.get(normalize(name))
+        if known is not None:
+            return known
+        candidates = tuple(candidate for candidate in candidates if candidate)
+        if candidates:
+            scores = sorted(((difflib.SequenceMatcher(None, normalize(name), normalize(candidate)).ratio(), candidate)
+                             for candidate in candidates), reverse=True)
+            best_score, best = scores[0]
+            runner_up = scores[1][0] if len(scores) > 1 else 0.0
+            if best_score >= FUZZY_CUTOFF and best_score - runner_up >= FUZZY_MARGIN:
+                return best
+        return self.intern(name)
+
+    def event_teams(self, event):
+        """(home, away) canonical names of an API event, for use as `candidates`; empty for outrights."""
+        home, away = event.get('home_team'), event.get('away_team')
+        if not home or not away:
+            return ()  # outrights events have no teams
+        return self.canonical(home), self.canonical(away)
+
+    def event_name(self, event, teams=None):
+        """Display name: "Home vs Away", or the sport title for an event without teams."""
+        teams = self.event_teams(event) if teams is None else teams
+        if teams:
+            return f"{teams[0]} vs {teams[1]}"
+        return event.get('sport_title') or event.get('sport_key') or str(event.get('id'))
+
+
+def load_aliases(path):
+    """Read a {canonical: [variants]} JSON alias file; a missing or empty path gives no aliases."""
+    if not path:
+        return {}
+    with open(path) as file:
+        return json.load(file)
+
+
+# Shared table used by the detection engines and the flattener
+team_names = NameTable(load_aliases(config.TEAM_ALIASES_FILE))
@@ -1,32 +1,80 @@
-import requests
-import os
-from dotenv import load_dotenv
-from datetime import datetime
-import pandas as pd
-
-# Load environment variables
-load_dotenv()
-
-# Retrieve API key from environment variables
-API_KEY = os.getenv('ODDS_API_KEY')
-
-def log_error(message):
-    # Get the current timestamp
-    now = datetime.now()
-    timestamp = now.strftime("%Y-%m-%d %H:%M:%S")  # Format as desired
-
-    # Construct the log message with the timestamp
-    log_message = f"{timestamp} - {message}\n"
-
-    # Append the log message to the file
-    with open('error.log', 'a') as log_file:
-        log_file.write(log_message)
-
-def fetch_odds(sport, regions='us,us2', markets='h2h,spreads,totals', odds_format='decimal', date_format='iso', bookmakers: str = ''):
-    # Adjust markets for outrights if necessary
-    if 'championship_winner' in sport:
-        markets = 'outrights'
-    
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import config
+from odds_cache import response_cache
+from poll_scheduler import api_quota
+from telemetry import span, timed
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the standard library decoder is several times slower
+    orjson = None
+
+# requests and pandas are imported where they are used, so importing this module for decode_json
+# (e.g. in parallel_scan workers) stays cheap.
+
+API_KEY = config.API_KEY
+
+logger = logging.getLogger(__name__)
+
+# Defaults for batch fetching
+MAX_CONCURRENT_REQUESTS = 8
+REQUEST_TIMEOUT = 10  # seconds
+MAX_RETRIES = 2
+RETRY_BACKOFF = 0.5  # seconds, doubled after each failed attempt
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+def decode_json(data):
+    """Decode a JSON response body (bytes, bytearray or memoryview), with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(bytes(data) if isinstance(data, memoryview) else data)
+
+def create_session(pool_size=MAX_CONCURRENT_REQUESTS):
+    """Create a keep-alive session whose connection pool can serve `pool_size` concurrent requests."""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def get_with_retry(http, url, params, timeout=REQUEST_TIMEOUT, retries=0, backoff=RETRY_BACKOFF):
+    """GET `url`, retrying connection errors and retryable status codes with exponential backoff.
+
+    Returns the last response received, or None if every attempt failed without one.
+    """
+    import requests
+
+    response = None
+    for attempt in range(retries + 1):
+        if attempt:
+            time.sleep(backoff * 2 ** (attempt - 1))
+        try:
+            response = http.get(url, params=params, timeout=timeout)
+        except requests.RequestException as e:
+            logger.warning("Request to %s failed (attempt %d/%d): %s", url, attempt + 1, retries + 1, e)
+            continue
+        if response.status_code not in RETRY_STATUS_CODES:
+            break
+    return response
+
+def sport_markets(sport, markets):
+    """Markets actually requested for `sport`: championship winner sports only offer outrights."""
+    return 'outrights' if 'championship_winner' in sport else markets
+
+def market_scopes(sports, markets):
+    """(sport, market) pairs covered by fetching `sports` with `markets`, for OpportunityLedger.record_snapshot."""
+    return [(sport, market) for sport in sports for market in sport_markets(sport, markets).split(',') if market]
+
+def fetch_odds(sport, regions='us,us2', markets='h2h,spreads,totals', odds_format='decimal', date_format='iso', bookmakers: str = '',
+               session=None, timeout=REQUEST_TIMEOUT, retries=0, backoff=RETRY_BACKOFF, use_cache=True, decode=True):
+    """Odds for one sport, decoded; with decode=False the raw JSON body (bytes), bypassing the response cache."""
+    markets = sport_markets(sport, markets)
     params = {
         'api_key': API_KEY,
         'regions': regions,
@@ -35,58 +83,105 @@ def fetch_odds(sport, regions='us,us2', markets='h2h,spreads,totals', odds_forma
         'dateFormat': date_format,
         'bookmakers': bookmakers
     }
-    odds_response = requests.get(f'https://api.the-odds-api.com/v4/sports/{sport}/odds', params=params)
+    url = f'{config.API_BASE_URL}/v4/sports/{sport}/odds'
+    if use_cache and decode:
+        odds_data = response_cache.get('odds', url, params)
+        if odds_data is not None:
+            return odds_data
+
+    if session is None:
+        import requests as session
+    with span('fetch', sport=sport):
+        odds_response = get_with_retry(session, url, params, timeout=timeout, retries=retries, backoff=backoff)
+    if odds_response is None:
+        logger.error("Error fetching odds for %s: no response after %d attempt(s)", sport, retries + 1,
+                     extra={'sport': sport})
+        return None
+    api_quota.record(odds_response.headers, sport)
     if odds_response.status_code == 200:
-        odds_data = odds_response.json()
-        print(f"Successfully fetched odds data for {sport}. Markets: {markets}")  # Debug message
+        if not decode:
+            return odds_response.content
+        with span('decode', sport=sport):
+            odds_data = decode_json(odds_response.content)
+        response_cache.set('odds', url, params, odds_data)
+        logger.debug("Fetched odds for %s. Markets: %s", sport, markets, extra={'sport': sport, 'events': len(odds_data)})
         return odds_data
     else:
-        error_message = f"Error fetching odds: {odds_response.status_code}, Response: {odds_response.json().get('message', '')}"
-        log_error(error_message)
-        print(error_message)  # Debug message
+        logger.error("Error fetching odds: %s, Response: %s", odds_response.status_code,
+                     error_message(odds_response), extra={'sport': sport})
         return None
 
-def present_data(odds_data, selected_sports, selected_markets):
-    print("Debug: Entering present_data function")
-    print(f"Debug: Selected sports: {selected_sports}")
-    print(f"Debug: Selected markets: {selected_markets}")
-    print(f"Debug: Odds data keys: {odds_data.keys()}")
+def error_message(response):
+    """The API's error message, or the raw body when it is not JSON (e.g. an HTML 502 from a proxy)."""
+    try:
+        return response.json().get('message', '')
+    except ValueError:
+        return response.text[:200]
 
-    all_data = []
+def fetch_odds_batch(sports, max_workers=MAX_CONCURRENT_REQUESTS, timeout=REQUEST_TIMEOUT, retries=MAX_RETRIES,
+                     backoff=RETRY_BACKOFF, session=None, **fetch_kwargs):
+    """Fetch odds for several sports in parallel over one pooled keep-alive session.
 
-    for sport in selected_sports:
-        print(f"Debug: Processing sport: {sport}")
-        if sport not in odds_data:
-            print(f"Debug: No data for sport {sport}")
-            continue
+    Yields `(sport, odds_data)` pairs in completion order, so callers can run arbitrage
+    detection on each sport as soon as it arrives. `odds_data` is None for failed sports.
+    Remaining keyword arguments (regions, markets, bookmakers, ...) are passed to fetch_odds.
+    """
+    sports = list(sports)
+    if not sports:
+        return
+    max_workers = max(1, min(max_workers, len(sports)))
+    own_session = session is None
+    if own_session:
+        session = create_session(max_workers)
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {
+            executor.submit(fetch_odds, sport, session=session, timeout=timeout, retries=retries, backoff=backoff, **fetch_kwargs): sport
+            for sport in sports
+        }
+        for future in as_completed(futures):
+            sport = futures[future]
+            try:
+                odds_data = future.result()
+            except Exception:
+                # One bad sport must not lose the rest of the batch
+                logger.exception("Error fetching odds for %s", sport, extra={'sport': sport})
+                odds_data = None
+            yield sport, odds_data
+    finally:
+        # Stop queued requests if the caller stops consuming early
+        executor.shutdown(wait=True, cancel_futures=True)
+        if own_session:
+            session.close()
+
+@timed('present', view='odds_api.present_data')
+def present_data(odds_data, selected_sports, selected_markets):
+    import pandas as pd
+    from odds_flattener import iter_outcomes
 
-        for event in odds_data[sport]:
-            print(f"Debug: Processing event: {event['id']}")
-            event_data = {
+    logger.debug("present_data: sports=%s markets=%s fetched=%s", selected_sports, selected_markets, list(odds_data))
+
+    # One row per event, with a column per bookmaker/market/outcome price (and point)
+    events = {}
+    selected_odds = {sport: odds_data[sport] for sport in selected_sports if sport in odds_data}
+    for sport, event, bookmaker, market, outcome in iter_outcomes(selected_odds, selected_markets):
+        event_data = events.get(event['id'])
+        if event_data is None:
+            event_data = events[event['id']] = {
                 'sport': sport,
                 'event_id': event['id'],
                 'home_team': event['home_team'],
                 'away_team': event['away_team'],
                 'commence_time': event['commence_time']
             }
-
-            for bookmaker in event['bookmakers']:
-                for market in bookmaker['markets']:
-                    if market['key'] in selected_markets:
-                        for outcome in market['outcomes']:
-                            key = f"{bookmaker['key']}_{market['key']}_{outcome['name']}"
-                            event_data[key] = outcome.get('price')
-                            if 'point' in outcome:
-                                event_data[f"{key}_point"] = outcome['point']
-
-            all_data.append(event_data)
+        key = f"{bookmaker['key']}_{market['key']}_{outcome['name']}"
+        event_data[key] = outcome.get('price')
+        if 'point' in outcome:
+            event_data[f"{key}_point"] = outcome['point']
+    all_data = list(events.values())
 
     df = pd.DataFrame(all_data)
-    print(f"Debug: Number of processed events: {len(df)}")
-    print("Debug: DataFrame columns", df.columns)
-    print("Debug: DataFrame shape", df.shape)
-    print("Debug: DataFrame head")
-    print(df.head())
+    logger.debug("present_data: %d events, %d columns", *df.shape)
 
     return df
 
@@ -0,0 +1,130 @@
+"""Response caching for Odds API calls.
+
+Responses are cached in memory (LRU, per-endpoint TTL) and optionally on disk so they
+survive restarts. The disk cache is enabled by setting ODDS_CACHE_DIR.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import config
+
+# Seconds each endpoint's responses stay fresh. The sports list barely changes; odds move constantly.
+CACHE_TTLS = {
+    'sports': config.SPORTS_CACHE_TTL,
+    'odds': config.ODDS_CACHE_TTL,
+}
+CACHE_MAX_ENTRIES = 512
+CACHE_DIR = config.CACHE_DIR
+
+
+def cache_key(url, params):
+    """Stable cache key for a request, ignoring the API key."""
+    params = {name: value for name, value in (params or {}).items() if name != 'api_key'}
+    return hashlib.sha1(f"{url}?{json.dumps(params, sort_keys=True)}".encode()).hexdigest()
+
+
+class TTLCache:
+    """Thread-safe in-memory LRU cache whose entries expire after their own TTL."""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DiskCache:
+    """JSON-file cache, one file per key, so cached responses survive restarts."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get_entry(self, key):
+        """Return (expires_at, value) for a fresh entry, or None."""
+        try:
+            with open(self._path(key)) as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if entry['expires_at'] <= time.time():
+            return None
+        return entry['expires_at'], entry['value']
+
+    def get(self, key):
+        entry = self.get_entry(key)
+        return None if entry is None else entry[1]
+
+    def set(self, key, value, ttl):
+        # Write then rename so concurrent readers never see a partial file
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump({'expires_at': time.time() + ttl, 'value': value}, file)
+        os.replace(tmp_path, path)
+
+
+class ResponseCache:
+    """Two-level response cache: in-memory LRU in front of an optional disk cache."""
+
+    def __init__(self, ttls=None, directory=CACHE_DIR, max_entries=CACHE_MAX_ENTRIES):
+        self.ttls = dict(CACHE_TTLS if ttls is None else ttls)
+        self.memory = TTLCache(max_entries)
+        self.disk = DiskCache(directory) if directory else None
+
+    def get(self, endpoint, url, params):
+        if self.ttls.get(endpoint, 0) <= 0:
+            return None
+        key = cache_key(url, params)
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            entry = self.disk.get_entry(key)
+            if entry is not None:
+                # Promote to memory for the rest of the entry's lifetime
+                expires_at, value = entry
+                self.memory.set(key, value, expires_at - time.time())
+        return value
+
+    def set(self, endpoint, url, params, value):
+        ttl = self.ttls.get(endpoint, 0)
+        if ttl <= 0:
+            return
+        key = cache_key(url, params)
+        self.memory.set(key, value, ttl)
+        if self.disk is not None:
+            self.disk.set(key, value, ttl)
+
+    def clear(self):
+        self.memory.clear()
+
+
+# Shared cache used by odds_api.fetch_odds and sports_selection.fetch_sports
+response_cache = ResponseCache()
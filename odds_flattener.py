@@ -0,0 +1,142 @@
+"""Single-pass flattening of Odds API payloads into compact typed columns.
+
+`iter_outcomes` is the one traversal of the nested payload (sport -> event -> bookmaker ->
+market -> outcome) shared by every flat view of the data. `flatten_odds` writes it into
+preallocated column arrays: string columns become integer codes into per-column category
+lists, prices are float32 and points are nullable float32. The resulting DataFrame uses
+categorical columns, so a row costs a few bytes per column instead of a Python dict.
+"""
+from array import array
+
+import numpy as np
+import pandas as pd
+
+from name_table import team_names
+from telemetry import timed
+
+FLAT_COLUMNS = ['sport', 'event_id', 'event_name', 'bookmaker', 'market_type', 'team', 'price', 'point']
+CATEGORY_COLUMNS = ['sport', 'event_id', 'event_name', 'bookmaker', 'market_type', 'team']
+
+
+def iter_outcomes(odds_by_sport, markets=None):
+    """Yield (sport_key, event, bookmaker, market, outcome) for every outcome, optionally limited to `markets`."""
+    for sport_key, odds_data in odds_by_sport.items():
+        for event in odds_data or []:
+            for bookmaker in event.get('bookmakers', []):
+                for market in bookmaker.get('markets', []):
+                    if markets is not None and market.get('key') not in markets:
+                        continue
+                    for outcome in market.get('outcomes', []):
+                        yield sport_key, event, bookmaker, market, outcome
+
+
+def count_outcomes(odds_by_sport, markets=None):
+    """Number of rows flatten_odds will produce, used to preallocate the columns."""
+    return sum(
+        len(market.get('outcomes', []))
+        for odds_data in odds_by_sport.values()
+        for event in odds_data or []
+        for bookmaker in event.get('bookmakers', [])
+        for market in bookmaker.get('markets', [])
+        if markets is None or market.get('key') in markets
+    )
+
+
+class OddsColumns:
+    """Preallocated typed column arrays for flattened odds rows."""
+
+    def __init__(self, capacity, names=team_names):
+        self.names = names  # canonicalizes team, outcome and event names (see name_table.py)
+        self.size = 0
+        self.codes = {column: array('i', bytes(4 * capacity)) for column in CATEGORY_COLUMNS}
+        self.categories = {column: [] for column in CATEGORY_COLUMNS}
+        self._lookup = {column: {} for column in CATEGORY_COLUMNS}
+        self.price = array('f', bytes(4 * capacity))
+        self.point = array('f', bytes(4 * capacity))  # NaN where the outcome has no point
+
+    def _code(self, column, value):
+        if value is None:
+            return -1  # missing value in a categorical column
+        lookup = self._lookup[column]
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(self.categories[column])
+            self.categories[column].append(value)
+        return code
+
+    def _grow(self, capacity):
+        for values in [*self.codes.values(), self.price, self.point]:
+            values.extend(array(values.typecode, bytes(values.itemsize * (capacity - len(values)))))
+
+    def extend(self, outcomes):
+        """Append the (sport_key, event, bookmaker, market, outcome) tuples yielded by iter_outcomes."""
+        code = self._code
+        canonical = self.names.canonical
+        sports, event_ids, event_names, bookmakers, market_types, team_column = (self.codes[column] for column in CATEGORY_COLUMNS)
+        prices, points = self.price, self.point
+        nan = float('nan')
+        index = self.size
+        last_event = last_bookmaker = last_market = None
+
+        for sport_key, event, bookmaker, market, outcome in outcomes:
+            # Codes only change with the enclosing event, bookmaker or market, so look them up once per object
+            if event is not last_event:
+                last_event = event
+                sport_code = code('sport', sport_key)
+                event_id_code = code('event_id', event.get('id'))
+                teams = self.names.event_teams(event)
+                event_name_code = code('event_name', self.names.event_name(event, teams))
+                team_codes = {}  # raw outcome name -> code, for this event
+            if bookmaker is not last_bookmaker:
+                last_bookmaker = bookmaker
+                bookmaker_code = code('bookmaker', bookmaker.get('title'))
+            if market is not last_market:
+                last_market = market
+                market_code = code('market_type', market.get('key'))
+            if index == len(prices):
+                self._grow(max(16, 2 * index))
+
+            sports[index] = sport_code
+            event_ids[index] = event_id_code
+            event_names[index] = event_name_code
+            bookmakers[index] = bookmaker_code
+            market_types[index] = market_code
+            name = outcome.get('name')
+            team_code = team_codes.get(name)
+            if team_code is None:
+                team_code = team_codes[name] = code('team', canonical(name, teams))
+            team_column[index] = team_code
+            price = outcome.get('price')
+            prices[index] = nan if price is None else price
+            point = outcome.get('point')
+            points[index] = nan if point is None else point
+            index += 1
+        self.size = index
+
+    def to_frame(self):
+        """Build a DataFrame with categorical string columns, float32 prices and nullable float32 points."""
+        size = self.size
+        data = {
+            column: pd.Categorical.from_codes(np.frombuffer(self.codes[column], dtype=np.int32, count=size),
+                                              categories=pd.Index(self.categories[column], dtype=object))
+            for column in CATEGORY_COLUMNS
+        }
+        data['price'] = np.frombuffer(self.price, dtype=np.float32, count=size).copy()
+        point = np.frombuffer(self.point, dtype=np.float32, count=size).copy()
+        data['point'] = pd.arrays.FloatingArray(point, np.isnan(point))
+        return pd.DataFrame(data, columns=FLAT_COLUMNS)
+
+
+@timed('flatten')
+def flatten_odds(odds_by_sport, markets=None, names=team_names):
+    """Flatten {sport_key: odds payload} into one compact row per outcome, with canonical team names."""
+    columns = OddsColumns(count_outcomes(odds_by_sport, markets), names)
+    columns.extend(iter_outcomes(odds_by_sport, markets))
+    return columns.to_frame()
+
+
+def price_values(prices):
+    """Prices as float64 with their quoted decimal values, undoing float32 storage error (2.1, not 2.0999999)."""
+    if prices.dtype == np.float32:
+        return prices.astype(str).astype(np.float64)
+    return prices.astype(np.float64)
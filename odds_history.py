@@ -0,0 +1,197 @@
+"""Append-only odds history stored as partitioned Parquet files.
+
+Every fetch is written as one immutable snapshot file under
+`<root>/sport=<sport_key>/date=<YYYY-MM-DD>/<fetched_at>.parquet`, holding the flattened
+odds rows (see odds_flattener) plus the fetch timestamp. Queries prune by sport and date
+partition and push the remaining filters down to the Parquet reader, so a question such as
+"all prices for event X from book Y over the last hour" only touches the matching files.
+
+One file per fetch adds up to thousands of small files a day, which slows directory listing
+and dataset discovery. `compact` merges each finished day of a sport into a single file
+named `<first fetched_at>_to_<last fetched_at>.parquet`; run it daily, e.g. from cron:
+
+    python -c "from odds_history import OddsHistoryStore; OddsHistoryStore().compact()"
+"""
+import os
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+import config
+from odds_flattener import FLAT_COLUMNS, flatten_odds
+
+PARTITIONING = ds.partitioning(pa.schema([('sport', pa.string()), ('date', pa.string())]), flavor='hive')
+STAMP_FORMAT = '%Y%m%dT%H%M%S%fZ'
+COMPACTED = '_to_'  # separates the first and last snapshot times in a compacted file's name
+
+
+def _utc(moment):
+    if moment is None:
+        return None
+    if isinstance(moment, (int, float)):
+        return datetime.fromtimestamp(moment, timezone.utc)
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+class OddsHistoryStore:
+    """Snapshot writer and range-query reader for the history directory (config.HISTORY_DIR by default)."""
+
+    def __init__(self, root=None):
+        self.root = root or config.HISTORY_DIR
+
+    def append_snapshot(self, sport, odds_data, fetched_at=None):
+        """Write one fetch of `sport` as a new snapshot file and return its path (None if it had no prices)."""
+        fetched_at = _utc(fetched_at) or datetime.now(timezone.utc)
+        df = flatten_odds({sport: odds_data}).drop(columns=['sport'])
+        if df.empty:
+            return None
+        df.insert(0, 'fetched_at', pd.Timestamp(fetched_at))
+
+        directory = os.path.join(self.root, f"sport={sport}", f"date={fetched_at:%Y-%m-%d}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{fetched_at:{STAMP_FORMAT}}.parquet")
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), _tmp_path(path))
+        os.replace(_tmp_path(path), path)
+        return path
+
+    def sports(self):
+        """Sport keys with stored snapshots."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name.split('=', 1)[1] for name in os.listdir(self.root) if name.startswith('sport='))
+
+    def snapshot_files(self, sport=None, start=None, end=None):
+        """Snapshot file paths in timestamp order, limited to `sport` and the [start, end] date range."""
+        start, end = _utc(start), _utc(end)
+        paths = []
+        for sport_key in ([sport] if sport else self.sports()):
+            sport_dir = os.path.join(self.root, f"sport={sport_key}")
+            if not os.path.isdir(sport_dir):
+                continue
+            for date_dir in os.listdir(sport_dir):
+                date = date_dir.split('=', 1)[1]
+                if (start and date < f"{start:%Y-%m-%d}") or (end and date > f"{end:%Y-%m-%d}"):
+                    continue
+                directory = os.path.join(sport_dir, date_dir)
+                paths.extend((name, sport_key, os.path.join(directory, name))
+                             for name in os.listdir(directory) if name.endswith('.parquet'))
+        return [(sport_key, path) for _, sport_key, path in sorted(paths)]
+
+    def iter_snapshots(self, sport=None, start=None, end=None, columns=None):
+        """Yield (sport, fetched_at, DataFrame) one snapshot at a time, in timestamp order."""
+        start, end = _utc(start), _utc(end)
+        for sport_key, path in self.snapshot_files(sport, start, end):
+            name = os.path.basename(path)
+            if COMPACTED in name:
+                read = None if columns is None else list(dict.fromkeys(['fetched_at', *columns]))
+                day = pq.read_table(path, columns=read).to_pandas()
+                extra = [] if columns is None or 'fetched_at' in columns else ['fetched_at']
+                snapshots = [(moment.to_pydatetime().replace(tzinfo=timezone.utc),
+                              group.drop(columns=extra).reset_index(drop=True)) for moment, group in day.groupby('fetched_at', sort=True)]
+            else:
+                fetched_at = datetime.strptime(name, f'{STAMP_FORMAT}.parquet').replace(tzinfo=timezone.utc)
+                snapshots = [(fetched_at, None)]
+            for fetched_at, df in snapshots:
+                if (start and fetched_at < start) or (end and fetched_at > end):
+                    continue
+                if df is None:
+                    df = pq.read_table(path, columns=columns).to_pandas()
+                df.insert(0, 'sport', sport_key)
+                yield sport_key, fetched_at, df
+
+    def compact(self, sport=None, before=None):
+        """Merge each day's snapshot files of `sport` (default: all) into one file, for days before `before`.
+
+        `before` defaults to now, so only finished UTC days are compacted; a day already
+        compacted is merged again with any files written to it since. Returns the new paths.
+        """
+        before = f"{_utc(before) or datetime.now(timezone.utc):%Y-%m-%d}"
+        compacted = []
+        for sport_key in ([sport] if sport else self.sports()):
+            sport_dir = os.path.join(self.root, f"sport={sport_key}")
+            if not os.path.isdir(sport_dir):
+                continue
+            for date_dir in sorted(os.listdir(sport_dir)):
+                if date_dir.split('=', 1)[1] >= before:
+                    continue
+                directory = os.path.join(sport_dir, date_dir)
+                names = sorted(name for name in os.listdir(directory) if name.endswith('.parquet'))
+                if len(names) > 1:
+                    compacted.append(_compact_files(directory, names))
+        return compacted
+
+    def query(self, sport=None, event_id=None, bookmaker=None, market_type=None, start=None, end=None, columns=None):
+        """Rows matching every given filter, e.g. one book's prices for one event over a time range."""
+        if not os.path.isdir(self.root):
+            return pd.DataFrame(columns=['fetched_at', *FLAT_COLUMNS])
+        start, end = _utc(start), _utc(end)
+        dataset = ds.dataset(self.root, format='parquet', partitioning=PARTITIONING)
+        # Reuse the discovered files under the common schema rather than listing the tree again
+        dataset = ds.FileSystemDataset(list(dataset.get_fragments()), _wide_schema(dataset.schema), dataset.format,
+                                       dataset.filesystem)
+
+        conditions = []
+        if sport:
+            conditions.append(ds.field('sport') == sport)
+        if start:
+            conditions.append(ds.field('date') >= f"{start:%Y-%m-%d}")
+            conditions.append(ds.field('fetched_at') >= pa.scalar(start, pa.timestamp('us', tz='UTC')))
+        if end:
+            conditions.append(ds.field('date') <= f"{end:%Y-%m-%d}")
+            conditions.append(ds.field('fetched_at') <= pa.scalar(end, pa.timestamp('us', tz='UTC')))
+        if event_id:
+            conditions.append(ds.field('event_id') == event_id)
+        if bookmaker:
+            conditions.append(ds.field('bookmaker') == bookmaker)
+        if market_type:
+            conditions.append(ds.field('market_type') == market_type)
+
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        df = dataset.to_table(columns=columns, filter=expression).to_pandas().drop(columns=['date'], errors='ignore')
+        if 'fetched_at' in df.columns:
+            df = df.sort_values('fetched_at', kind='stable', ignore_index=True)
+        return df
+
+    def recent(self, event_id, bookmaker=None, hours=1, sport=None):
+        """All prices for an event (optionally from one bookmaker) over the last `hours`."""
+        return self.query(sport=sport, event_id=event_id, bookmaker=bookmaker,
+                          start=datetime.now(timezone.utc) - timedelta(hours=hours))
+
+
+def _tmp_path(path):
+    # A leading dot keeps a file still being written out of dataset scans (pyarrow skips "." and "_" names)
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.tmp")
+
+
+def _wide_schema(schema):
+    """`schema` with every dictionary column indexed by int32.
+
+    Each snapshot encodes its categorical columns with the narrowest index that fits, so files
+    differ (int8, int16, ...) and must be read or merged through one common schema.
+    """
+    return pa.schema([field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+                      if pa.types.is_dictionary(field.type) else field for field in schema], schema.metadata)
+
+
+def _compact_files(directory, names):
+    """Rewrite the snapshot files `names` in `directory` as one file and delete them; returns its path."""
+    paths = [os.path.join(directory, name) for name in names]
+    tables = [pq.read_table(path) for path in paths]
+    schema = _wide_schema(tables[0].schema)
+    table = pa.concat_tables([table.select(schema.names).cast(schema) for table in tables])
+    table = table.sort_by('fetched_at')
+    stamps = table.column('fetched_at')
+    first, last = stamps[0].as_py(), stamps[-1].as_py()
+    path = os.path.join(directory, f"{first:{STAMP_FORMAT}}{COMPACTED}{last:{STAMP_FORMAT}}.parquet")
+    pq.write_table(table, _tmp_path(path))
+    os.replace(_tmp_path(path), path)
+    for old in paths:
+        if old != path:
+            os.remove(old)
+    return path
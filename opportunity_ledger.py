@@ -0,0 +1,199 @@
+"""Embedded SQLite ledger of every arbitrage opportunity seen.
+
+Opportunities are identified by a fingerprint of their event, market and legs (outcome,
+point and bookmaker). Each row is one lifetime of an opportunity: while it stays open, the
+same arb seen on every poll updates that row's `last_seen` and `observations`; once closed,
+a later sighting of the same fingerprint starts a new row, so `duration` is how long each
+appearance lasted. A different book taking over a leg is a different fingerprint.
+`record_snapshot` writes a whole detection pass in one transaction and closes the open rows
+of the (sport, market) pairs it covered that were not seen again; other markets of the same
+sport, which another process sharing the database may be polling, are left alone.
+`mark_acted` records that an opportunity was bet.
+
+The database runs in WAL mode, so the dashboard and reports can read while the service
+writes. Indexes cover time-range, sport, open-opportunity and bookmaker queries:
+
+    ledger = OpportunityLedger()
+    ledger.query(start=time.time() - 86400, bookmaker='FanDuel')
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+
+import config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS opportunities (
+    id INTEGER PRIMARY KEY,
+    fingerprint INTEGER NOT NULL,
+    sport TEXT,
+    event_id TEXT,
+    event_name TEXT,
+    market_type TEXT,
+    outcome_name TEXT,
+    point TEXT,
+    bookmakers TEXT,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    closed_at REAL,
+    observations INTEGER NOT NULL DEFAULT 1,
+    arb_percentage REAL,
+    best_arb_percentage REAL,
+    profit REAL,
+    acted_at REAL,
+    note TEXT
+);
+CREATE INDEX IF NOT EXISTS opportunities_first_seen ON opportunities (first_seen);
+CREATE INDEX IF NOT EXISTS opportunities_sport ON opportunities (sport, first_seen);
+CREATE INDEX IF NOT EXISTS opportunities_fingerprint ON opportunities (fingerprint);
+CREATE UNIQUE INDEX IF NOT EXISTS opportunities_open ON opportunities (fingerprint) WHERE closed_at IS NULL;
+CREATE INDEX IF NOT EXISTS opportunities_open_market ON opportunities (sport, market_type, last_seen)
+    WHERE closed_at IS NULL;
+CREATE TABLE IF NOT EXISTS opportunity_legs (
+    fingerprint INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    outcome TEXT,
+    point REAL,
+    bookmaker TEXT,
+    odds REAL,
+    PRIMARY KEY (fingerprint, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS opportunity_legs_bookmaker ON opportunity_legs (bookmaker, fingerprint);
+"""
+
+UPSERT = """
+INSERT INTO opportunities (fingerprint, sport, event_id, event_name, market_type, outcome_name, point, bookmakers,
+                           first_seen, last_seen, arb_percentage, best_arb_percentage, profit)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (fingerprint) WHERE closed_at IS NULL DO UPDATE SET
+    last_seen = excluded.last_seen,
+    observations = observations + 1,
+    arb_percentage = excluded.arb_percentage,
+    best_arb_percentage = min(best_arb_percentage, excluded.arb_percentage),
+    profit = excluded.profit
+"""
+
+# Legs are shared by every lifetime of a fingerprint and keep the odds it was first seen at
+INSERT_LEG = "INSERT OR IGNORE INTO opportunity_legs VALUES (?, ?, ?, ?, ?, ?)"
+
+COLUMNS = """id, fingerprint, sport, event_id, event_name, market_type, outcome_name, point, bookmakers, first_seen,
+last_seen, closed_at, observations, arb_percentage, best_arb_percentage, profit, acted_at, note,
+coalesce(closed_at, last_seen) - first_seen AS duration"""
+
+
+def fingerprint(opportunity):
+    """Stable 64-bit id of an opportunity: event, market and each leg's outcome, point and bookmaker."""
+    parts = [str(opportunity['event_id']), str(opportunity['market_type'])]
+    for leg in opportunity['legs']:
+        parts.extend((str(leg['outcome']), str(leg['point']), str(leg['bookmaker'])))
+    digest = hashlib.blake2b('\x1f'.join(parts).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+class OpportunityLedger:
+    """SQLite opportunity ledger at `path` (config.LEDGER_PATH by default); safe to share between threads."""
+
+    def __init__(self, path=None):
+        self.path = path or config.LEDGER_PATH
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")  # durable at checkpoints; fine for a ledger
+            self.connection.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+    def record_snapshot(self, opportunities, scopes, seen_at=None):
+        """Record one detection pass: upsert its opportunities and close the unseen ones of `scopes`.
+
+        `scopes` are the (sport, market_type) pairs that were fetched (see odds_api.market_scopes).
+        Returns the fingerprints recorded.
+        """
+        seen_at = time.time() if seen_at is None else seen_at
+        rows, legs = {}, []
+        for opportunity in opportunities:
+            key = fingerprint(opportunity)
+            if key in rows:
+                continue
+            rows[key] = (key, opportunity['sport'], opportunity['event_id'], opportunity['event_name'],
+                         opportunity['market_type'], opportunity['outcome_name'], opportunity['point'],
+                         ','.join(dict.fromkeys(leg['bookmaker'] for leg in opportunity['legs'])),
+                         seen_at, seen_at, opportunity['arb_percentage'], opportunity['arb_percentage'],
+                         opportunity['profit'])
+            legs.extend((key, position, leg['outcome'], leg['point'], leg['bookmaker'], leg['odds'])
+                        for position, leg in enumerate(opportunity['legs']))
+        with self._lock, self.connection:
+            self.connection.executemany(UPSERT, rows.values())
+            self.connection.executemany(INSERT_LEG, legs)
+            self.connection.executemany(
+                "UPDATE opportunities SET closed_at = ? "
+                "WHERE closed_at IS NULL AND sport = ? AND market_type = ? AND last_seen < ?",
+                [(seen_at, sport, market_type, seen_at) for sport, market_type in scopes])
+        return list(rows)
+
+    def mark_acted(self, key, note=None, acted_at=None):
+        """Record that the opportunity with fingerprint `key` (its latest lifetime) was bet on."""
+        with self._lock, self.connection:
+            self.connection.execute("UPDATE opportunities SET acted_at = ?, note = coalesce(?, note) "
+                                    "WHERE id = (SELECT max(id) FROM opportunities WHERE fingerprint = ?)",
+                                    (time.time() if acted_at is None else acted_at, note, key))
+
+    def _select(self, sql, parameters):
+        with self._lock:
+            return [dict(row) for row in self.connection.execute(sql, parameters)]
+
+    def query(self, start=None, end=None, sports=None, bookmaker=None, open_only=False, limit=1000):
+        """Opportunities first seen in [start, end] (POSIX timestamps), newest first.
+
+        Optionally limited to some sports, to those with a leg at `bookmaker` and to those still open.
+        """
+        where, parameters = [], []
+        if start is not None:
+            where.append("first_seen >= ?")
+            parameters.append(start)
+        if end is not None:
+            where.append("first_seen <= ?")
+            parameters.append(end)
+        if sports:
+            sports = list(sports)
+            where.append(f"sport IN ({', '.join('?' * len(sports))})")
+            parameters.extend(sports)
+        if bookmaker:
+            where.append("EXISTS (SELECT 1 FROM opportunity_legs AS legs "
+                         "WHERE legs.fingerprint = opportunities.fingerprint AND legs.bookmaker = ?)")
+            parameters.append(bookmaker)
+        if open_only:
+            where.append("closed_at IS NULL")
+        sql = f"SELECT {COLUMNS} FROM opportunities"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY first_seen DESC"
+        if limit:
+            sql += " LIMIT ?"
+            parameters.append(limit)
+        return self._select(sql, parameters)
+
+    def legs(self, key):
+        """Legs of one opportunity, with the odds first seen."""
+        return self._select("SELECT outcome, point, bookmaker, odds FROM opportunity_legs WHERE fingerprint = ? "
+                            "ORDER BY position", (key,))
+
+    def bookmaker_summary(self, start=None, end=None, sports=None):
+        """Per bookmaker: opportunities it was a leg of, mean lifetime in seconds and best arb percentage."""
+        where = "first_seen >= ? AND first_seen <= ?"
+        parameters = [start if start is not None else float('-inf'), end if end is not None else float('inf')]
+        if sports:
+            sports = list(sports)
+            where += f" AND sport IN ({', '.join('?' * len(sports))})"
+            parameters.extend(sports)
+        sql = ("SELECT legs.bookmaker AS bookmaker, count(DISTINCT opportunities.id) AS opportunities, "
+               "avg(coalesce(closed_at, last_seen) - first_seen) AS mean_duration, "
+               "min(best_arb_percentage) AS best_arb_percentage "
+               f"FROM opportunity_legs AS legs JOIN opportunities USING (fingerprint) WHERE {where} "
+               "GROUP BY legs.bookmaker ORDER BY opportunities DESC")
+        return self._select(sql, parameters)
@@ -0,0 +1,225 @@
+"""Push opportunity open/update/close messages to live consumers.
+
+`OpportunityBroadcaster.publish` takes the change records produced by
+IncrementalArbitrageScanner, drops repeats (an opportunity is identified by
+arbitrage_finder.opportunity_key: event, market and legs) and fans the remaining messages
+out to every subscriber. Each subscriber has its own bounded queue; when a consumer falls
+behind, its oldest messages are dropped, so publishing never blocks the scan loop.
+
+Consumers:
+- a Server-Sent Events endpoint (`start_stream_server`): `GET /events` streams messages,
+  starting with the currently open opportunities; `GET /opportunities` returns them as JSON,
+  and, given a market_edges.MarketEdgeIndex, `GET /near-arbs?margin=1.0` the markets within
+  `margin` percent of an arb.
+- `WebhookSink`, which POSTs each message as JSON to a URL from a background thread.
+
+    curl -N http://127.0.0.1:8766/events
+"""
+import json
+import logging
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from arbitrage_finder import opportunity_key
+
+DEFAULT_STREAM_PORT = 8766
+SUBSCRIBER_QUEUE_SIZE = 256
+HEARTBEAT_INTERVAL = 15  # seconds between SSE keep-alive comments
+WEBHOOK_TIMEOUT = 5  # seconds
+
+logger = logging.getLogger(__name__)
+
+
+def encode_message(message):
+    return json.dumps(message, default=str)
+
+
+class Subscription:
+    """A subscriber's bounded message queue. Iterate with get(); call close() when done."""
+
+    def __init__(self, broadcaster, maxsize):
+        self.broadcaster = broadcaster
+        self.queue = queue.Queue(maxsize)
+        self.dropped = 0
+
+    def put(self, message):
+        """Enqueue without blocking, discarding the oldest message if the queue is full."""
+        while True:
+            try:
+                self.queue.put_nowait(message)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        """Next message, or None if none arrives within `timeout` seconds."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broadcaster.unsubscribe(self)
+
+
+class OpportunityBroadcaster:
+    def __init__(self, queue_size=SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.open = {}  # opportunity_key -> last published opportunity
+        self.subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, replay_open=True):
+        """Register a subscriber, optionally pre-loaded with an 'open' message per currently open opportunity."""
+        subscription = Subscription(self, self.queue_size)
+        with self._lock:
+            if replay_open:
+                for opportunity in self.open.values():
+                    subscription.put(self._message('open', opportunity))
+            self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self.subscribers.discard(subscription)
+
+    def publish(self, changes):
+        """Fan out scanner change records, skipping any that repeat what was already published.
+
+        Returns the messages actually sent.
+        """
+        sent = []
+        with self._lock:
+            for change in changes:
+                opportunity = change['opportunity']
+                key = opportunity_key(opportunity)
+                previous = self.open.get(key)
+                if change['type'] == 'close':
+                    if previous is None:
+                        continue
+                    del self.open[key]
+                    message = self._message('close', opportunity)
+                else:
+                    if previous == opportunity:
+                        continue
+                    self.open[key] = opportunity
+                    message = self._message('open' if previous is None else 'update', opportunity)
+                for subscription in self.subscribers:
+                    subscription.put(message)
+                sent.append(message)
+        return sent
+
+    def open_opportunities(self):
+        with self._lock:
+            return list(self.open.values())
+
+    @staticmethod
+    def _message(message_type, opportunity):
+        return {'type': message_type, 'key': opportunity_key(opportunity), 'opportunity': opportunity,
+                'published_at': time.time()}
+
+
+class StreamHandler(BaseHTTPRequestHandler):
+    """Serves /events (SSE), /opportunities and /near-arbs (JSON) from the broadcaster and edge index on the server."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path, _, query = self.path.partition('?')
+        if path == '/events':
+            return self._stream()
+        if path == '/opportunities':
+            return self._send_json(self.server.broadcaster.open_opportunities())
+        if path == '/near-arbs' and self.server.edge_index is not None:
+            try:
+                margin = float(parse_qs(query).get('margin', ['1.0'])[0])
+            except ValueError:
+                return self.send_error(400, "margin must be a number")
+            return self._send_json(self.server.edge_index.near_arbs(margin))
+        self.send_error(404)
+
+    def _send_json(self, value):
+        body = encode_message(value).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        subscription = self.server.broadcaster.subscribe()
+        try:
+            while not self.server.stopping.is_set():
+                message = subscription.get(timeout=HEARTBEAT_INTERVAL)
+                if message is None:
+                    self.wfile.write(b": keep-alive\n\n")
+                else:
+                    self.wfile.write(f"event: {message['type']}\ndata: {encode_message(message)}\n\n".encode())
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client went away
+        finally:
+            subscription.close()
+
+
+def start_stream_server(broadcaster, host='127.0.0.1', port=DEFAULT_STREAM_PORT, edge_index=None):
+    """Serve the broadcaster over SSE (and `edge_index` on /near-arbs) on a background thread; returns (server, base_url).
+
+    Stop it with `server.stopping.set(); server.shutdown()`.
+    """
+    server = ThreadingHTTPServer((host, port), StreamHandler)
+    server.daemon_threads = True
+    server.broadcaster = broadcaster
+    server.edge_index = edge_index
+    server.stopping = threading.Event()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+class WebhookSink:
+    """POST every broadcast message as JSON to `url` from a background thread."""
+
+    def __init__(self, broadcaster, url, timeout=WEBHOOK_TIMEOUT):
+        self.url = url
+        self.timeout = timeout
+        import requests  # only needed when a webhook is configured
+
+        self.subscription = broadcaster.subscribe(replay_open=False)
+        self.session = requests.Session()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        import requests
+
+        while not self._stopping.is_set():
+            message = self.subscription.get(timeout=1)
+            if message is None:
+                continue
+            try:
+                response = self.session.post(self.url, data=encode_message(message),
+                                             headers={'Content-Type': 'application/json'}, timeout=self.timeout)
+                if response.status_code >= 400:
+                    logger.error("Webhook %s returned %s", self.url, response.status_code)
+            except requests.RequestException as e:
+                logger.error("Webhook %s failed: %s", self.url, e)
+
+    def close(self):
+        self._stopping.set()
+        self._thread.join()
+        self.subscription.close()
+        self.session.close()
@@ -0,0 +1,177 @@
+"""Arbitrage detection sharded across a process pool, for very large slates.
+
+`ShardedArbitrageScanner.scan` takes raw Odds API response bodies ({sport_key: bytes}, as
+returned by `fetch_odds(..., decode=False)`) instead of decoded payloads. The bodies are
+copied once into a single shared-memory block, and each task only receives the block's
+name and the byte range of its events; the worker decodes that range in place (orjson when
+installed) and runs `find_arbitrage_opportunities` on it. No nested odds dicts cross a
+process boundary, only the opportunities found.
+
+Decoding costs about twice as much as detection, so a large sport is split without being
+parsed: the parent looks, near each shard boundary, for the `},{"id":` that starts the next
+top-level event and hands each worker a contiguous run of events to decode. Each byte is
+decoded once, by one worker. If a range does not decode on its own (an unexpected body
+layout), that sport is scanned unsplit instead. Results are merged back into the
+single-process order (sports in input order, then events in payload order).
+
+    with ShardedArbitrageScanner(workers=8) as scanner:
+        opportunities = scanner.scan(raw_payloads)
+
+`submit` starts a scan and returns at once, so the caller can decode the bodies it needs
+itself (for history or CSV) while the workers run.
+"""
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from arbitrage_finder import DEFAULT_BANKROLL, find_arbitrage_opportunities
+from odds_api import decode_json
+from telemetry import span
+
+SHARD_BYTES = 2 * 1024 * 1024  # target response bytes per shard of one sport
+
+# The comma between two top-level events; every Odds API event object starts with its "id"
+EVENT_BOUNDARY = re.compile(rb'\}\s*,\s*(?=\{\s*"id"\s*:)')
+
+
+def event_ranges(body, shards):
+    """Split a JSON array body into at most `shards` (start, end) byte ranges of whole events.
+
+    Each range holds the comma-separated objects only, without the enclosing brackets.
+    """
+    start, end = body.find(b'['), body.rfind(b']')
+    if start < 0 or end < start:
+        return [(0, len(body))]
+    ranges = []
+    start += 1
+    for shard in range(1, shards):
+        match = EVENT_BOUNDARY.search(body, max(start, len(body) * shard // shards))
+        if match is None or match.end() >= end:
+            break
+        ranges.append((start, match.start() + 1))
+        start = match.end()
+    ranges.append((start, end))
+    return ranges
+
+
+def _scan_range(segment_name, offset, length, bankroll, whole):
+    """Worker: decode one byte range from shared memory and detect arbitrage in it.
+
+    `whole` ranges are complete bodies; the others are events to wrap in brackets. Returns
+    None when a partial range does not decode on its own.
+    """
+    segment = shared_memory.SharedMemory(name=segment_name)  # the parent owns and unlinks the block
+    try:
+        view = segment.buf[offset:offset + length]
+        try:
+            if whole:
+                odds_data = decode_json(view)
+            else:
+                try:
+                    odds_data = decode_json(b'[' + view + b']')
+                except ValueError:
+                    return None
+        finally:
+            view.release()
+    finally:
+        segment.close()
+    return find_arbitrage_opportunities(odds_data, bankroll)
+
+
+class ScanJob:
+    """A scan running in the pool; `result()` waits for it and frees its shared memory."""
+
+    def __init__(self, executor, bodies, shard_count, bankroll):
+        self._executor = executor
+        self._bankroll = bankroll
+        self._segment = shared_memory.SharedMemory(create=True, size=max(1, sum(len(body) for body in bodies)))
+        self._tasks = []  # (sport index, shard, body offset, body length, future)
+        try:
+            offset = 0
+            for index, body in enumerate(bodies):
+                self._segment.buf[offset:offset + len(body)] = body
+                ranges = event_ranges(body, shard_count(len(body)))
+                whole = len(ranges) == 1
+                for shard, (start, end) in enumerate(ranges):
+                    if whole:
+                        start, end = 0, len(body)
+                    self._tasks.append((index, shard, offset, len(body),
+                                        self._submit(offset + start, end - start, whole)))
+                offset += len(body)
+        except BaseException:
+            self._segment.close()
+            self._segment.unlink()
+            raise
+
+    def _submit(self, offset, length, whole):
+        return self._executor.submit(_scan_range, self._segment.name, offset, length, self._bankroll, whole)
+
+    def result(self):
+        """Opportunities in single-process order."""
+        try:
+            found = {}
+            retried = set()
+            for index, shard, offset, length, future in self._tasks:
+                opportunities = future.result()
+                if opportunities is None:
+                    # A range did not decode alone: rescan this sport's whole body once, in place of its shards
+                    if index not in retried:
+                        retried.add(index)
+                        found[index] = {0: self._submit(offset, length, True).result()}
+                    continue
+                if index not in retried:
+                    found.setdefault(index, {})[shard] = opportunities
+            return [opportunity for index in sorted(found)
+                    for shard in sorted(found[index]) for opportunity in found[index][shard]]
+        finally:
+            self._segment.close()
+            self._segment.unlink()
+
+
+class _DoneJob:
+    def __init__(self, opportunities):
+        self._opportunities = opportunities
+
+    def result(self):
+        return self._opportunities
+
+
+class ShardedArbitrageScanner:
+    """Process pool running find_arbitrage_opportunities over raw response bodies; reuse it across cycles."""
+
+    def __init__(self, workers=None, shard_bytes=SHARD_BYTES):
+        self.workers = workers or os.cpu_count() or 1
+        self.shard_bytes = shard_bytes
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def shard_count(self, length):
+        return max(1, min(self.workers, length // self.shard_bytes))
+
+    def submit(self, payloads, bankroll=DEFAULT_BANKROLL):
+        """Start scanning {sport_key: raw JSON body}; returns a job whose `result()` is what `scan` returns."""
+        bodies = [body for body in payloads.values() if body]
+        if not bodies:
+            return _DoneJob([])
+        if self.workers <= 1:
+            return _DoneJob([opportunity for body in bodies
+                             for opportunity in find_arbitrage_opportunities(decode_json(body), bankroll)])
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return ScanJob(self._executor, bodies, self.shard_count, bankroll)
+
+    def scan(self, payloads, bankroll=DEFAULT_BANKROLL):
+        """Opportunities in {sport_key: raw JSON body}, in the order a single-process scan would return them."""
+        with span('detect', engine='sharded'):
+            return self.submit(payloads, bankroll).result()
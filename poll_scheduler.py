@@ -0,0 +1,126 @@
+"""Quota-aware polling schedule for the Odds API.
+
+The Odds API reports the account's quota on every response (x-requests-remaining,
+x-requests-used and x-requests-last, the cost of that call). `api_quota` tracks those
+headers, and PollScheduler uses them to decide which sports to poll next: sports whose
+next event starts soonest, or whose prices are moving fastest, are polled most often, within
+a per-cycle request budget.
+"""
+import threading
+import time
+from datetime import datetime
+
+VELOCITY_SCALE = 1.0  # implied-probability points per minute at which a sport's poll interval halves
+
+
+class QuotaTracker:
+    """Latest quota figures reported by the API, plus the observed cost of each sport's odds call."""
+
+    def __init__(self):
+        self.remaining = None
+        self.used = None
+        self.costs = {}  # sport -> quota units used by its last odds request
+        self._lock = threading.Lock()
+
+    def record(self, headers, sport=None):
+        """Update from a response's headers; `sport` attributes the request cost to an odds call."""
+        with self._lock:
+            if headers.get('x-requests-remaining') is not None:
+                self.remaining = float(headers['x-requests-remaining'])
+            if headers.get('x-requests-used') is not None:
+                self.used = float(headers['x-requests-used'])
+            if sport and headers.get('x-requests-last') is not None:
+                self.costs[sport] = float(headers['x-requests-last'])
+
+
+# Shared tracker updated by odds_api.fetch_odds and sports_selection.fetch_sports
+api_quota = QuotaTracker()
+
+
+def parse_commence_time(value):
+    """Parse an ISO-8601 commence_time (e.g. "2024-03-01T00:10:00Z") to a POSIX timestamp."""
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except (AttributeError, ValueError):
+        return None
+
+
+class PollScheduler:
+    """Spread odds polls across sports by priority within a fixed request budget.
+
+    A sport's poll interval grows with the time until its next event starts: sports with an
+    event in play or starting within the hour are polled every `min_interval` seconds, and
+    each further hour adds another `min_interval`, up to `max_interval`. Sports never polled
+    come first.
+
+    With `movement` (a line_movement.PriceHistory), the interval is further divided by
+    1 + the sport's fastest market velocity / `velocity_scale`, never going below `min_interval`.
+    """
+
+    def __init__(self, budget_per_cycle=10, reserve=0, min_interval=60, max_interval=3600, default_cost=1,
+                 quota=api_quota, movement=None, velocity_scale=VELOCITY_SCALE):
+        self.budget_per_cycle = budget_per_cycle
+        self.reserve = reserve
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.default_cost = default_cost
+        self.quota = quota
+        self.movement = movement
+        self.velocity_scale = velocity_scale
+        self.last_polled = {}    # sport -> timestamp of last successful poll
+        self.next_commence = {}  # sport -> commence time of its earliest listed event (in the past when in play)
+
+    def record_odds(self, sport, odds_data, now=None):
+        """Record a successful poll of `sport` and when its next event starts.
+
+        The API only lists upcoming and in-play events, so an event that already started is live
+        (where prices move most) and counts as starting now.
+        """
+        now = time.time() if now is None else now
+        self.last_polled[sport] = now
+        starts = [start for start in (parse_commence_time(event.get('commence_time')) for event in odds_data or [])
+                  if start is not None]
+        if starts:
+            self.next_commence[sport] = min(starts)
+        else:
+            self.next_commence.pop(sport, None)
+
+    def poll_interval(self, sport, now=None):
+        now = time.time() if now is None else now
+        start = self.next_commence.get(sport)
+        if start is None:
+            interval = self.max_interval
+        else:
+            hours_until = max(0.0, (start - now) / 3600)
+            interval = min(self.max_interval, self.min_interval * (1 + int(hours_until)))
+        if self.movement is not None:
+            interval = max(self.min_interval, interval / (1 + self.movement.sport_velocity(sport) / self.velocity_scale))
+        return interval
+
+    def priority(self, sport, now=None):
+        """Sort key: never-polled sports first, then by how overdue the sport is relative to its interval."""
+        now = time.time() if now is None else now
+        if sport not in self.last_polled:
+            return (0, 0.0)
+        overdue = (now - self.last_polled[sport]) / self.poll_interval(sport, now)
+        return (1, -overdue)
+
+    def due_sports(self, sports, now=None):
+        """Sports to poll this cycle, most urgent first, capped by the cycle budget and the remaining quota."""
+        now = time.time() if now is None else now
+        due = [sport for sport in sports
+               if sport not in self.last_polled or now - self.last_polled[sport] >= self.poll_interval(sport, now)]
+        due.sort(key=lambda sport: self.priority(sport, now))
+
+        budget = self.budget_per_cycle
+        if self.quota.remaining is not None:
+            budget = min(budget, self.quota.remaining - self.reserve)
+
+        selected = []
+        for sport in due:
+            cost = self.quota.costs.get(sport, self.default_cost)
+            if cost > budget:
+                continue
+            selected.append(sport)
+            budget -= cost
+        return selected
@@ -0,0 +1,230 @@
+"""Local stand-in for the Odds API, for offline benchmarking and profiling.
+
+Serves `/v4/sports` and `/v4/sports/{sport}/odds` either from recorded fixtures or from
+synthetic payloads, with optional injected latency and errors. Point the pipeline at it
+by setting ODDS_API_BASE_URL, e.g.:
+
+    python replay_server.py synthetic --sports 30 --events 20 --bookmakers 10 --port 8765
+    ODDS_API_BASE_URL=http://127.0.0.1:8765 python main.py
+
+Fixtures are a directory holding `sports.json` and `odds/<sport>.json`. `record` captures
+them from the live API:
+
+    python replay_server.py record fixtures/ --sports basketball_nba,soccer_epl
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from synthetic_odds import generate_odds, generate_sports
+
+DEFAULT_PORT = 8765
+DEFAULT_QUOTA = 500
+
+
+class FixtureSource:
+    """Recorded payloads: `sports.json` and `odds/<sport>.json` under `directory`."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._odds = {}
+
+    def sports(self):
+        with open(os.path.join(self.directory, 'sports.json')) as file:
+            return json.load(file)
+
+    def odds(self, sport):
+        if sport not in self._odds:
+            path = os.path.join(self.directory, 'odds', f"{sport}.json")
+            if not os.path.exists(path):
+                return None
+            with open(path) as file:
+                self._odds[sport] = json.load(file)
+        return self._odds[sport]
+
+
+class SyntheticSource:
+    """Generated payloads for `n_sports` sports x `n_events` events x `n_bookmakers` bookmakers."""
+
+    def __init__(self, n_sports, n_events, n_bookmakers, seed=0):
+        self.n_events = n_events
+        self.n_bookmakers = n_bookmakers
+        self.seed = seed
+        self._sports = generate_sports(n_sports)
+        self._keys = {sport['key'] for sport in self._sports}
+        self._odds = {}
+        self._lock = threading.Lock()
+
+    def sports(self):
+        return self._sports
+
+    def odds(self, sport):
+        if sport not in self._keys:
+            return None
+        with self._lock:
+            if sport not in self._odds:
+                self._odds[sport] = generate_odds(sport, self.n_events, self.n_bookmakers, seed=self.seed)
+            return self._odds[sport]
+
+
+def filter_odds(odds_data, markets=None, bookmakers=None):
+    """Restrict a payload to the requested markets and bookmaker keys, as the API does."""
+    if not markets and not bookmakers:
+        return odds_data
+    filtered = []
+    for event in odds_data:
+        event_bookmakers = []
+        for bookmaker in event.get('bookmakers', []):
+            if bookmakers and bookmaker['key'] not in bookmakers:
+                continue
+            book_markets = [market for market in bookmaker.get('markets', []) if not markets or market['key'] in markets]
+            if book_markets:
+                event_bookmakers.append(dict(bookmaker, markets=book_markets))
+        filtered.append(dict(event, bookmakers=event_bookmakers))
+    return filtered
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """Answers API requests from the source, latency and error settings stored on the server by make_server."""
+
+    def log_message(self, format, *args):
+        pass  # keep benchmark output clean
+
+    def do_GET(self):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency * server.rng.uniform(0.5, 1.5))
+        if server.error_rate and server.rng.random() < server.error_rate:
+            status = server.rng.choice([429, 500, 503])
+            return self._send(status, {'message': f"Injected error {status}"}, cost=0)
+
+        url = urlparse(self.path)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        parts = [part for part in url.path.split('/') if part]
+
+        if parts == ['v4', 'sports']:
+            return self._send(200, server.source.sports(), cost=0)
+        if len(parts) == 4 and parts[:2] == ['v4', 'sports'] and parts[3] == 'odds':
+            odds_data = server.source.odds(parts[2])
+            if odds_data is None:
+                return self._send(404, {'message': f"Unknown sport {parts[2]}"}, cost=0)
+            markets = [market for market in params.get('markets', '').split(',') if market]
+            bookmakers = [bookmaker for bookmaker in params.get('bookmakers', '').split(',') if bookmaker]
+            regions = [region for region in params.get('regions', 'us').split(',') if region]
+            # The real API charges markets x regions per odds call
+            return self._send(200, filter_odds(odds_data, markets, bookmakers),
+                              cost=max(1, len(markets)) * max(1, len(regions)))
+        return self._send(404, {'message': 'Not found'}, cost=0)
+
+    def _send(self, status, payload, cost):
+        server = self.server
+        with server.quota_lock:
+            server.quota_used += cost
+            used = server.quota_used
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('x-requests-used', str(used))
+        self.send_header('x-requests-remaining', str(max(0, server.quota - used)))
+        self.send_header('x-requests-last', str(cost))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def make_server(source, host='127.0.0.1', port=DEFAULT_PORT, latency=0.0, error_rate=0.0, quota=DEFAULT_QUOTA, seed=0):
+    """Create a replay server for `source`; port 0 picks a free port (see server.server_address)."""
+    server = ThreadingHTTPServer((host, port), ReplayHandler)
+    server.daemon_threads = True
+    server.source = source
+    server.latency = latency
+    server.error_rate = error_rate
+    server.rng = random.Random(seed)
+    server.quota = quota
+    server.quota_used = 0
+    server.quota_lock = threading.Lock()
+    return server
+
+
+def start_server(source, **kwargs):
+    """Start a replay server on a background thread and return (server, base_url)."""
+    server = make_server(source, **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+def record_fixtures(directory, sports, regions='us,us2', markets='h2h,spreads,totals', bookmakers=''):
+    """Capture live `/v4/sports` and odds payloads for `sports` into a fixture directory."""
+    import requests
+    import config
+    from odds_api import API_KEY, fetch_odds
+
+    os.makedirs(os.path.join(directory, 'odds'), exist_ok=True)
+    response = requests.get(f'{config.API_BASE_URL}/v4/sports', params={'api_key': API_KEY})
+    response.raise_for_status()
+    with open(os.path.join(directory, 'sports.json'), 'w') as file:
+        json.dump(response.json(), file)
+
+    for sport in sports:
+        odds_data = fetch_odds(sport, regions=regions, markets=markets, bookmakers=bookmakers, use_cache=False)
+        if odds_data is not None:
+            with open(os.path.join(directory, 'odds', f"{sport}.json"), 'w') as file:
+                json.dump(odds_data, file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve recorded or synthetic Odds API payloads locally.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_server_options(subparser):
+        subparser.add_argument('--host', default='127.0.0.1')
+        subparser.add_argument('--port', type=int, default=DEFAULT_PORT)
+        subparser.add_argument('--latency', type=float, default=0.0, help="mean seconds of delay per request")
+        subparser.add_argument('--error-rate', type=float, default=0.0, help="share of requests answered with 429/5xx")
+        subparser.add_argument('--quota', type=int, default=DEFAULT_QUOTA)
+        subparser.add_argument('--seed', type=int, default=0)
+
+    fixtures = subparsers.add_parser('fixtures', help="serve a recorded fixture directory")
+    fixtures.add_argument('directory')
+    add_server_options(fixtures)
+
+    synthetic = subparsers.add_parser('synthetic', help="serve generated payloads")
+    synthetic.add_argument('--sports', type=int, default=10)
+    synthetic.add_argument('--events', type=int, default=15)
+    synthetic.add_argument('--bookmakers', type=int, default=10)
+    add_server_options(synthetic)
+
+    record = subparsers.add_parser('record', help="record live payloads into a fixture directory")
+    record.add_argument('directory')
+    record.add_argument('--sports', required=True, help="comma-separated sport keys")
+    record.add_argument('--regions', default='us,us2')
+    record.add_argument('--markets', default='h2h,spreads,totals')
+    record.add_argument('--bookmakers', default='')
+
+    args = parser.parse_args()
+    if args.command == 'record':
+        record_fixtures(args.directory, args.sports.split(','), args.regions, args.markets, args.bookmakers)
+        return
+
+    if args.command == 'fixtures':
+        source = FixtureSource(args.directory)
+    else:
+        source = SyntheticSource(args.sports, args.events, args.bookmakers, seed=args.seed)
+    server = make_server(source, args.host, args.port, args.latency, args.error_rate, args.quota, args.seed)
+    print(f"Serving Odds API replay on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
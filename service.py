@@ -0,0 +1,182 @@
+"""Headless service mode: poll the Odds API continuously and report arbitrage as it opens and closes.
+
+Sports, markets, regions and bookmakers come from config (ODDS_SPORTS, ODDS_MARKETS, ...).
+Each cycle PollScheduler picks the sports that are due within the request budget, their odds
+are fetched over one keep-alive session kept open for the life of the process, and
+IncrementalArbitrageScanner reports only the opportunities that opened, changed or closed.
+Changes are printed and published to the live stream (STREAM_PORT, WEBHOOK_URL; see
+opportunity_stream.py) as soon as each sport's detection finishes, and each sport's open
+opportunities are recorded in the SQLite ledger (LEDGER_PATH; see opportunity_ledger.py).
+SIGINT/SIGTERM finish the current cycle and exit cleanly.
+
+    python service.py
+    ODDS_SPORTS=basketball_nba,icehockey_nhl POLL_INTERVAL=30 python service.py
+"""
+import argparse
+import logging
+import signal
+import threading
+import time
+
+import config
+from arbitrage_finder import DEFAULT_BANKROLL
+from incremental_scanner import IncrementalArbitrageScanner, opportunity_change
+from main import format_opportunity
+from odds_api import MAX_CONCURRENT_REQUESTS, create_session, fetch_odds_batch, market_scopes
+from opportunity_stream import OpportunityBroadcaster, WebhookSink, start_stream_server
+from poll_scheduler import PollScheduler
+from sports_selection import fetch_sports
+from telemetry import setup_logging, span, start_metrics_server
+
+logger = logging.getLogger(__name__)
+
+
+def format_change(change):
+    """One line per change, e.g. "OPEN   basketball_nba | A vs B | h2h A vs B | 98.40% | A 51.2 @ 1.95 (...); ..."."""
+    return f"{change['type'].upper():<6} {format_opportunity(change['opportunity'], stakes=change['type'] != 'close')}"
+
+
+def withhold_stale(changes):
+    """Turn opens and updates of stale opportunities into closes, so consumers only see fresh prices."""
+    return [opportunity_change('close', change['opportunity'])
+            if change['type'] != 'close' and change['opportunity'].get('stale') else change
+            for change in changes]
+
+
+class ArbitrageService:
+    def __init__(self, sports=None, regions=None, markets=None, bookmakers=None, cycle_interval=None,
+                 bankroll=DEFAULT_BANKROLL, scheduler=None, history=None, broadcaster=None, skip_stale=None,
+                 ledger=None):
+        self.sports = sports if sports is not None else config.SPORTS
+        self.regions = regions or config.REGIONS
+        self.markets = markets or config.MARKETS
+        self.bookmakers = bookmakers if bookmakers is not None else config.BOOKMAKERS
+        self.cycle_interval = config.POLL_INTERVAL if cycle_interval is None else cycle_interval
+        self.scanner = IncrementalArbitrageScanner(bankroll, stale_after=config.STALE_AFTER)
+        self.skip_stale = config.SKIP_STALE if skip_stale is None else skip_stale
+        # Fast-moving sports are polled sooner, using the scanner's price history
+        self.scheduler = scheduler or PollScheduler(budget_per_cycle=config.POLL_BUDGET, reserve=config.QUOTA_RESERVE,
+                                                    min_interval=config.MIN_POLL_INTERVAL,
+                                                    max_interval=config.MAX_POLL_INTERVAL,
+                                                    movement=self.scanner.movement)
+        if history is None and config.HISTORY_DIR:
+            from odds_history import OddsHistoryStore  # pyarrow and pandas load only when history is on
+            history = OddsHistoryStore()
+        self.history = history
+        if ledger is None and config.LEDGER_PATH:
+            from opportunity_ledger import OpportunityLedger
+            ledger = OpportunityLedger()
+        self.ledger = ledger
+        self.broadcaster = broadcaster or OpportunityBroadcaster()
+        self.session = create_session(MAX_CONCURRENT_REQUESTS)
+        self.stop_event = threading.Event()
+        self._known_sports = []
+
+    def sports_to_poll(self):
+        """Configured sports, or every sport the API lists (cached for SPORTS_CACHE_TTL) when none are configured."""
+        if self.sports:
+            return list(self.sports)
+        categorized_sports = fetch_sports(session=self.session)
+        if categorized_sports:
+            self._known_sports = [sport for sports in categorized_sports.values() for sport in sports]
+        return self._known_sports
+
+    def run_cycle(self):
+        """Poll the sports that are due and report opportunity changes; returns the changes."""
+        due = self.scheduler.due_sports(self.sports_to_poll())
+        changes = []
+        with span('cycle'):
+            for sport, odds_data in fetch_odds_batch(due, session=self.session, regions=self.regions, markets=self.markets,
+                                                     odds_format=config.ODDS_FORMAT, date_format=config.DATE_FORMAT,
+                                                     bookmakers=self.bookmakers):
+                if odds_data is None:
+                    continue
+                self.scheduler.record_odds(sport, odds_data)
+                if self.history:
+                    with span('history'):
+                        self.history.append_snapshot(sport, odds_data)
+                sport_changes = self.scanner.apply_snapshot(odds_data, sport)
+                if self.ledger:
+                    with span('ledger'):
+                        self.ledger.record_snapshot([opportunity for opportunity in self.scanner.current_opportunities()
+                                                     if opportunity['sport'] == sport],
+                                                    market_scopes([sport], self.markets))
+                if self.skip_stale:
+                    sport_changes = withhold_stale(sport_changes)
+                with span('present', view='service'):
+                    sent = self.broadcaster.publish(sport_changes)
+                    # With skip_stale, only print what reached the stream (no closes of never-opened stale arbs)
+                    for change in (sent if self.skip_stale else sport_changes):
+                        print(format_change(change))
+                changes.extend(sport_changes)
+                if self.stop_event.is_set():
+                    break
+        logger.info("Poll cycle: %d sports polled, %d changes", len(due), len(changes),
+                    extra={'sports': len(due), 'changes': len(changes)})
+        return changes
+
+    def run(self, once=False):
+        """Run cycles every `cycle_interval` seconds until stop() is called (or just one with `once`)."""
+        try:
+            while not self.stop_event.is_set():
+                started = time.monotonic()
+                try:
+                    self.run_cycle()
+                except Exception:
+                    # Keep the service alive through a bad cycle; the next one starts from the same state
+                    logger.exception("Poll cycle failed")
+                if once:
+                    break
+                self.stop_event.wait(max(0.0, self.cycle_interval - (time.monotonic() - started)))
+        finally:
+            self.close()
+
+    def stop(self, signum=None, frame=None):
+        """Ask the service to finish its current cycle and exit; usable as a signal handler."""
+        self.stop_event.set()
+
+    def close(self):
+        self.session.close()
+        if self.ledger:
+            self.ledger.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Poll the Odds API continuously and report arbitrage changes.")
+    parser.add_argument('--once', action='store_true', help="run a single cycle and exit")
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    service = ArbitrageService()
+    signal.signal(signal.SIGINT, service.stop)
+    signal.signal(signal.SIGTERM, service.stop)
+    print(f"Polling {', '.join(service.sports) if service.sports else 'all sports'} every {service.cycle_interval:g}s "
+          f"(markets: {service.markets}, bookmakers: {service.bookmakers or 'all'})")
+
+    stream_server = webhook = metrics_server = None
+    if config.METRICS_PORT is not None:
+        metrics_server, metrics_url = start_metrics_server(config.STREAM_HOST, config.METRICS_PORT)
+        print(f"Serving metrics on {metrics_url}/metrics")
+    if config.STREAM_PORT is not None:
+        stream_server, stream_url = start_stream_server(service.broadcaster, config.STREAM_HOST, config.STREAM_PORT,
+                                                        edge_index=service.scanner.edge_index)
+        print(f"Streaming opportunities on {stream_url}/events")
+    if config.WEBHOOK_URL:
+        webhook = WebhookSink(service.broadcaster, config.WEBHOOK_URL)
+    try:
+        service.run(once=args.once)
+    finally:
+        if stream_server:
+            stream_server.stopping.set()
+            stream_server.shutdown()
+            stream_server.server_close()
+        if webhook:
+            webhook.close()
+        if metrics_server:
+            metrics_server.shutdown()
+            metrics_server.server_close()
+    print(f"Stopped with {len(service.scanner.current_opportunities())} open opportunities.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,38 @@
-import requests
-from dotenv import load_dotenv
-import os
+import logging
+import config
+from odds_api import MAX_RETRIES, REQUEST_TIMEOUT, RETRY_BACKOFF, error_message, get_with_retry
+from odds_cache import response_cache
+from poll_scheduler import api_quota
 
-# Load environment variables
-load_dotenv()
+API_KEY = config.API_KEY
 
-# Retrieve API key from environment variables
-API_KEY = os.getenv('ODDS_API_KEY')
+logger = logging.getLogger(__name__)
 
-def fetch_sports():
-    """Fetch and categorize available sports from the Odds API."""
-    sports_response = requests.get(
-        'https://api.the-odds-api.com/v4/sports',
-        params={'api_key': API_KEY}
-    )
+def fetch_sports(use_cache=True, session=None, timeout=REQUEST_TIMEOUT, retries=MAX_RETRIES, backoff=RETRY_BACKOFF):
+    """Fetch and categorize available sports from the Odds API; pass the caller's pooled `session` when it has one."""
+    url = f'{config.API_BASE_URL}/v4/sports'
+    params = {'api_key': API_KEY}
+    if use_cache:
+        sports_data = response_cache.get('sports', url, params)
+        if sports_data is not None:
+            return categorize_sports(sports_data)
+
+    if session is None:
+        import requests as session  # only when the cache misses, so importing this module stays cheap
+    sports_response = get_with_retry(session, url, params, timeout=timeout, retries=retries, backoff=backoff)
+    if sports_response is None:
+        logger.error("Error fetching sports: no response after %d attempt(s)", retries + 1)
+        return None
+    api_quota.record(sports_response.headers)
     if sports_response.status_code == 200:
         sports_data = sports_response.json()
+        response_cache.set('sports', url, params, sports_data)
         # print(sports_data)
         # Example categorization (further refinement needed based on actual API response structure)
         categorized_sports = categorize_sports(sports_data)
         return categorized_sports
     else:
-        print(f"Error fetching sports: {sports_response.status_code}")
+        logger.error("Error fetching sports: %s, Response: %s", sports_response.status_code, error_message(sports_response))
         return None
 
 def categorize_sports(sports_data):
@@ -0,0 +1,107 @@
+"""Split funded bankrolls across concurrent arbitrage opportunities.
+
+`allocate_stakes` takes the current opportunities, each bookmaker's available balance and
+optional per-bet maximum stakes and stake increments, and decides how much to place on
+every leg. Opportunities are funded greedily, best return first: each gets the largest
+total stake its books' remaining balances and limits allow, split so every outcome pays
+the same, then rounded to the books' increments choosing the rounding (up or down per
+leg) with the highest guaranteed profit. The result is not LP-optimal when opportunities
+compete for one book's balance, but it is close in practice and runs in well under a
+millisecond per opportunity, so it can be redone every poll cycle.
+"""
+import itertools
+import math
+
+from arbitrage_finder import opportunity_key
+
+DEFAULT_INCREMENT = 1.0
+MAX_ROUNDING_LEGS = 4  # beyond this many legs stakes are only rounded down
+
+
+def _round_down(value, increment):
+    return math.floor(value / increment + 1e-9) * increment
+
+
+def _round_up(value, increment):
+    return math.ceil(value / increment - 1e-9) * increment
+
+
+def max_total_stake(legs, balances, max_stakes):
+    """Largest total stake for which every leg fits its book's remaining balance and per-bet limit."""
+    implied = [1 / leg['odds'] for leg in legs]
+    total_implied = sum(implied)
+    share_by_book = {}
+    limit = math.inf
+    for leg, probability in zip(legs, implied):
+        share = probability / total_implied
+        share_by_book[leg['bookmaker']] = share_by_book.get(leg['bookmaker'], 0.0) + share
+        if leg['bookmaker'] in max_stakes:
+            limit = min(limit, max_stakes[leg['bookmaker']] / share)
+    for bookmaker, share in share_by_book.items():
+        limit = min(limit, balances.get(bookmaker, 0.0) / share)
+    return limit
+
+
+def round_stakes(legs, total, increments, balances, max_stakes, default_increment=DEFAULT_INCREMENT):
+    """Round the equal-payout split of `total` to book increments, keeping the most profitable feasible rounding.
+
+    Returns (stakes, guaranteed profit), or (None, 0.0) if no rounding is feasible and profitable.
+    """
+    exact = [total * (1 / leg['odds']) / sum(1 / other['odds'] for other in legs) for leg in legs]
+    steps = [increments.get(leg['bookmaker'], default_increment) for leg in legs]
+    if len(legs) > MAX_ROUNDING_LEGS:
+        choices = [[_round_down(stake, step)] for stake, step in zip(exact, steps)]
+    else:
+        choices = [[_round_down(stake, step), _round_up(stake, step)] for stake, step in zip(exact, steps)]
+
+    best, best_profit = None, 0.0
+    for stakes in itertools.product(*choices):
+        if any(stake <= 0 or stake > max_stakes.get(leg['bookmaker'], math.inf) for leg, stake in zip(legs, stakes)):
+            continue
+        spent = {}
+        for leg, stake in zip(legs, stakes):
+            spent[leg['bookmaker']] = spent.get(leg['bookmaker'], 0.0) + stake
+        if any(amount > balances.get(bookmaker, 0.0) + 1e-9 for bookmaker, amount in spent.items()):
+            continue
+        profit = min(stake * leg['odds'] for leg, stake in zip(legs, stakes)) - sum(stakes)
+        if profit > best_profit:
+            best, best_profit = list(stakes), profit
+    return best, best_profit
+
+
+def allocate_stakes(opportunities, balances, max_stakes=None, increments=None, default_increment=DEFAULT_INCREMENT,
+                    min_profit=0.0):
+    """Allocate `balances` ({bookmaker title: amount}) across `opportunities`.
+
+    Returns (allocations, remaining balances). Each allocation holds the opportunity, its
+    key, the legs with their stakes, the total stake and the guaranteed payout and profit.
+    Books missing from `balances` are treated as unfunded.
+    """
+    max_stakes = max_stakes or {}
+    increments = increments or {}
+    remaining = dict(balances)
+    allocations = []
+
+    # Best guaranteed return per unit staked first
+    for opportunity in sorted(opportunities, key=lambda opportunity: opportunity['arb_percentage']):
+        legs = opportunity['legs']
+        if opportunity['arb_percentage'] >= 100 or len(legs) < 2:
+            continue
+        total = max_total_stake(legs, remaining, max_stakes)
+        if not math.isfinite(total) or total <= 0:
+            continue
+        stakes, profit = round_stakes(legs, total, increments, remaining, max_stakes, default_increment)
+        if stakes is None or profit <= min_profit:
+            continue
+
+        for leg, stake in zip(legs, stakes):
+            remaining[leg['bookmaker']] -= stake
+        allocations.append({
+            'opportunity': opportunity,
+            'key': opportunity_key(opportunity),
+            'legs': [dict(leg, stake=stake) for leg, stake in zip(legs, stakes)],
+            'total_stake': sum(stakes),
+            'guaranteed_payout': min(stake * leg['odds'] for leg, stake in zip(legs, stakes)),
+            'guaranteed_profit': profit,
+        })
+    return allocations, remaining
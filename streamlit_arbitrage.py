@@ -1,65 +1,222 @@
+import logging
+import threading
+import time
+
 import streamlit as st
 import pandas as pd
-from dotenv import load_dotenv
-import os
-from odds_api import fetch_odds, log_error
-from arbitrage_finder import find_arbitrage_opportunities
+import config
+from odds_api import create_session, fetch_odds_batch, market_scopes
 from sports_selection import fetch_sports
-import json
+from main import format_stakes
+from odds_flattener import flatten_odds
+from vectorized_arbitrage import find_arbitrage_opportunities_df
+from opportunity_ledger import OpportunityLedger
+from telemetry import setup_logging
+
+API_KEY = config.API_KEY
 
-# Load environment variables
-load_dotenv()
-API_KEY = os.getenv('ODDS_API_KEY')
+BOOKMAKERS = "betmgm,draftkings,espnbet,fanduel,williamhill_us"
+REFRESH_SECONDS = 5  # how often the results section re-reads the poller's snapshots
+WATCH_TIMEOUT = 600  # stop polling a sport no session has asked for in this many seconds
+PAGE_SIZES = [50, 100, 250, 500]
+HISTORY_WINDOW = 86400  # seconds of ledger history shown
+
+logger = logging.getLogger(__name__)
 
 def present_data(odds_data, selected_sports, selected_markets):
-    flattened_data = []
-
-    st.write("Debug: Entering present_data function")
-    st.write(f"Debug: Selected sports: {selected_sports}")
-    st.write(f"Debug: Selected markets: {selected_markets}")
-    st.write(f"Debug: Odds data keys: {odds_data.keys()}")
-
-    for sport_key in selected_sports:
-        st.write(f"Debug: Processing sport: {sport_key}")
-        for event in odds_data.get(sport_key, []):
-            st.write(f"Debug: Processing event: {event.get('id')}")
-            event_id = event.get('id')
-            event_name = f"{event.get('home_team')} vs {event.get('away_team')}"
-            for bookmaker in event.get('bookmakers', []):
-                bookmaker_name = bookmaker.get('title')
-                for market in bookmaker.get('markets', []):
-                    market_key = market.get('key')
-                    if market_key in selected_markets:
-                        st.write(f"Debug: Processing market: {market_key}")
-                        for outcome in market.get('outcomes', []):
-                            data = {
-                                'sport': sport_key,
-                                'event_id': event_id,
-                                'event_name': event_name,
-                                'bookmaker': bookmaker_name,
-                                'market_type': market_key,
-                                'team': outcome.get('name'),
-                                'price': outcome.get('price'),
-                                'point': outcome.get('point')
-                            }
-                            if market_key == 'h2h':
-                                data['point'] = None
-                            elif market_key == 'spreads':
-                                data['point'] = outcome.get('point')
-                            elif market_key == 'totals':
-                                data['point'] = f"{market.get('totals')} {outcome.get('name')}"
-                            
-                            flattened_data.append(data)
-
-    st.write(f"Debug: Number of flattened data entries: {len(flattened_data)}")
-    return pd.DataFrame(flattened_data)
+    return flatten_odds({sport_key: odds_data.get(sport_key, []) for sport_key in selected_sports}, markets=selected_markets)
+
+class OddsPoller:
+    """Background thread keeping the watched sports' flattened odds and opportunities fresh.
+
+    One poller is shared by every dashboard session (see get_poller), so reruns and filter
+    changes only read its in-memory snapshots and never wait on the API.
+    """
+
+    def __init__(self, interval=config.POLL_INTERVAL, ledger=None):
+        self.interval = interval
+        self.ledger = ledger  # every poll's opportunities are recorded here when given
+        self.snapshots = {}  # sport -> {'markets', 'fetched_at', 'odds_df', 'opportunities'}
+        self.watched = {}    # sport -> (markets, last time a session asked for it)
+        self.version = 0     # bumped whenever a snapshot changes
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self.session = create_session()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def watch(self, sports, markets):
+        """Keep `sports` polled with `markets`; polls immediately if any of them is new or changed markets."""
+        markets = ','.join(markets)
+        now = time.time()
+        with self._lock:
+            changed = any(self.watched.get(sport, (None,))[0] != markets for sport in sports)
+            for sport in sports:
+                self.watched[sport] = (markets, now)
+        if changed:
+            self._wake.set()
+
+    def refresh(self):
+        """Poll every watched sport now instead of waiting for the interval."""
+        with self._lock:
+            for snapshot in self.snapshots.values():
+                snapshot['fetched_at'] = 0
+        self._wake.set()
+
+    def snapshot(self, sports):
+        """(version, {sport: snapshot}) for the requested sports that have been fetched."""
+        with self._lock:
+            return self.version, {sport: self.snapshots[sport] for sport in sports if sport in self.snapshots}
+
+    def _due(self):
+        now = time.time()
+        due = {}
+        with self._lock:
+            for sport, (markets, requested_at) in list(self.watched.items()):
+                if now - requested_at > WATCH_TIMEOUT:
+                    del self.watched[sport]
+                    continue
+                snapshot = self.snapshots.get(sport)
+                if snapshot is None or snapshot['markets'] != markets or now - snapshot['fetched_at'] >= self.interval:
+                    due.setdefault(markets, []).append(sport)
+        return due
+
+    def _run(self):
+        while True:
+            self._wake.clear()
+            try:
+                for markets, sports in self._due().items():
+                    self.poll(sports, markets)
+            except Exception:
+                logger.exception("Dashboard poll failed")
+            self._wake.wait(self.interval)
+
+    def poll(self, sports, markets):
+        for sport_key, odds_data in fetch_odds_batch(sports, session=self.session, regions=config.REGIONS, markets=markets,
+                                                     odds_format=config.ODDS_FORMAT, date_format=config.DATE_FORMAT,
+                                                     bookmakers=BOOKMAKERS):
+            if odds_data is None:
+                continue
+            odds_df = present_data({sport_key: odds_data}, [sport_key], markets.split(','))
+            snapshot = {
+                'markets': markets,
+                'fetched_at': time.time(),
+                'odds_df': odds_df,
+                'opportunities': find_arbitrage_opportunities_df(odds_df),
+            }
+            if self.ledger:
+                self.ledger.record_snapshot(snapshot['opportunities'], market_scopes([sport_key], markets))
+            with self._lock:
+                self.snapshots[sport_key] = snapshot
+                self.version += 1
+
+@st.cache_resource
+def get_poller():
+    setup_logging()
+    return OddsPoller(ledger=OpportunityLedger() if config.LEDGER_PATH else None)
+
+@st.cache_data(ttl=config.SPORTS_CACHE_TTL, show_spinner=False)
+def load_sports():
+    return fetch_sports()
+
+@st.cache_resource(max_entries=8)
+def combined_snapshot(version, sports, _snapshots):
+    """Odds rows and formatted opportunities across `sports`, built once per poller version."""
+    frames = [_snapshots[sport]['odds_df'] for sport in sports]
+    combined_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    opp_df = pd.DataFrame([opportunity for sport in sports for opportunity in _snapshots[sport]['opportunities']])
+    if not opp_df.empty:
+        opp_df['arb_percentage'] = opp_df['arb_percentage'].apply(lambda x: f"{x:.2f}%")
+        opp_df['legs'] = opp_df['legs'].apply(format_stakes)
+    return combined_df, opp_df
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def odds_csv(version, sports, _combined_df):
+    return _combined_df.to_csv(index=False)
+
+def show_page(df, key):
+    """Show one page of `df` with page size and page number controls."""
+    columns = st.columns(2)
+    page_size = columns[0].selectbox("Rows per page", PAGE_SIZES, key=f"{key}_page_size")
+    pages = max(1, -(-len(df) // page_size))
+    page = columns[1].number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key=f"{key}_page")
+    start = (page - 1) * page_size
+    st.dataframe(df.iloc[start:start + page_size], width='stretch')
+    st.caption(f"Rows {min(start + 1, len(df))}-{min(start + page_size, len(df))} of {len(df)}")
+
+def show_history(ledger, sports):
+    """Opportunities the ledger saw for `sports` in the last HISTORY_WINDOW seconds, and how long they lasted."""
+    st.header("Opportunity History")
+    since = time.time() - HISTORY_WINDOW
+    history_df = pd.DataFrame(ledger.query(start=since, sports=sports))
+    if history_df.empty:
+        st.info("No opportunities recorded for the selected sports in the last 24 hours.")
+        return
+    for column in ['first_seen', 'last_seen', 'closed_at']:
+        history_df[column] = pd.to_datetime(history_df[column], unit='s')
+    history_df['arb_percentage'] = history_df['arb_percentage'].apply(lambda x: f"{x:.2f}%")
+    history_df['best_arb_percentage'] = history_df['best_arb_percentage'].apply(lambda x: f"{x:.2f}%")
+    show_page(history_df.drop(columns=['id', 'fingerprint', 'event_id', 'acted_at', 'note']), 'history')
+    with st.expander("By bookmaker"):
+        st.dataframe(pd.DataFrame(ledger.bookmaker_summary(start=since, sports=sports)), width='stretch')
+
+@st.fragment(run_every=REFRESH_SECONDS)
+def show_results(poller, selected_sports, markets):
+    # Re-register on every refresh, not only on full reruns, so an open but idle session keeps its sports polled
+    poller.watch(selected_sports, markets)
+    version, snapshots = poller.snapshot(selected_sports)
+    if not snapshots:
+        st.info("Fetching odds in the background...")
+        return
+    sports = tuple(sport for sport in selected_sports if sport in snapshots)
+    combined_df, opp_df = combined_snapshot(version, sports, snapshots)
+
+    oldest = min(snapshot['fetched_at'] for snapshot in snapshots.values())
+    st.caption(f"{len(sports)} of {len(selected_sports)} sports loaded, "
+               f"oldest fetched at {time.strftime('%H:%M:%S', time.localtime(oldest))}")
+    if time.time() - oldest > 3 * poller.interval:
+        st.warning("Some odds are more than three poll intervals old; the API may be failing or out of quota.")
+
+    # Display arbitrage opportunities
+    st.header("Arbitrage Opportunities")
+    if not opp_df.empty:
+        st.dataframe(opp_df, width='stretch')
+    else:
+        st.info("No arbitrage opportunities were found across the selected sports.")
+
+    if poller.ledger:
+        show_history(poller.ledger, sports)
+
+    # Filter odds data in memory
+    st.header("Odds Data")
+    if combined_df.empty:
+        st.warning("No odds data for the selected sports.")
+        return
+    columns = st.columns(3)
+    market_filter = columns[0].multiselect("Market type", markets, default=markets)
+    bookmaker_filter = columns[1].multiselect("Bookmaker", sorted(combined_df['bookmaker'].dropna().unique()))
+    search = columns[2].text_input("Event or team contains")
+    mask = combined_df['market_type'].isin(market_filter)
+    if bookmaker_filter:
+        mask &= combined_df['bookmaker'].isin(bookmaker_filter)
+    if search:
+        mask &= (combined_df['event_name'].astype(str).str.contains(search, case=False, regex=False)
+                 | combined_df['team'].astype(str).str.contains(search, case=False, regex=False))
+    show_page(combined_df[mask], 'odds')
+
+    st.download_button(
+        label="Download Odds Data as CSV",
+        data=odds_csv(version, sports, combined_df),
+        file_name="odds_data.csv",
+        mime="text/csv",
+    )
 
 def main():
     st.title("Sports Arbitrage Finder")
 
     # Fetch and categorize sports
-    categorized_sports = fetch_sports()
+    categorized_sports = load_sports()
     if not categorized_sports:
+        load_sports.clear()  # don't keep a failed fetch cached for SPORTS_CACHE_TTL; retry on the next rerun
         st.error("Failed to fetch sports.")
         return
 
@@ -67,10 +224,10 @@ def main():
     st.header("Select Sports")
     selected_sports = []
     for category, sports in categorized_sports.items():
-        st.subheader(category)
-        for sport in sports:
-            if st.checkbox(sport, key=sport):
-                selected_sports.append(sport)
+        with st.expander(f"{category} ({len(sports)})"):
+            for sport in sports:
+                if st.checkbox(sport, key=sport):
+                    selected_sports.append(sport)
 
     if not selected_sports:
         st.warning("Please select at least one sport.")
@@ -81,80 +238,16 @@ def main():
     # Market selection
     st.header("Select Markets")
     markets = st.multiselect("Choose markets", ['h2h', 'spreads', 'totals'], default=['h2h'])
+    if not markets:
+        st.warning("Please select at least one market type.")
+        return
+
+    # Odds are fetched by the shared background poller; show_results tells it what to watch
+    poller = get_poller()
+    if st.button("Refresh Odds Now"):
+        poller.refresh()
 
-    # Fetch odds button
-    if st.button("Fetch Odds and Find Arbitrage Opportunities"):
-        if not markets:
-            st.warning("Please select at least one market type.")
-            return
-
-        combined_df = pd.DataFrame()
-        all_opportunities = []
-
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-
-        for i, sport_key in enumerate(selected_sports):
-            status_text.text(f"Fetching odds for {sport_key}...")
-
-            regions = 'us,us2'
-            odds_format = 'decimal'
-            date_format = 'iso'
-            bookmakers_list = "betmgm,draftkings,espnbet,fanduel,williamhill_us"
-
-            odds_data = fetch_odds(sport=sport_key, regions=regions, markets=','.join(markets), odds_format=odds_format, date_format=date_format, bookmakers=bookmakers_list)
-
-            st.write(f"Debug: Odds data for {sport_key}:")
-            st.write(odds_data)
-
-            if odds_data:
-                sport_df = present_data({sport_key: odds_data}, [sport_key], markets)
-                st.write(f"Debug: Sport DataFrame for {sport_key}:")
-                st.write(sport_df)
-                combined_df = pd.concat([combined_df, sport_df], ignore_index=True, sort=False)
-                opportunities = find_arbitrage_opportunities(odds_data)
-                all_opportunities.extend(opportunities)
-
-            progress_bar.progress((i + 1) / len(selected_sports))
-
-        status_text.text("Processing complete!")
-
-        # Debug information
-        # st.write("Debug: DataFrame columns", combined_df.columns)
-        # st.write("Debug: DataFrame shape", combined_df.shape)
-        # st.write("Debug: DataFrame head", combined_df.head())
-
-        # Display odds data
-        st.header("Odds Data")
-        st.dataframe(combined_df)
-
-        # Filter odds data
-        st.header("Filter Odds Data")
-        if 'market_type' in combined_df.columns:
-            market_filter = st.multiselect("Filter by market type", markets, default=markets)
-            filtered_df = combined_df[combined_df['market_type'].isin(market_filter)]
-            st.dataframe(filtered_df)
-        else:
-            st.warning("Market type information is not available in the data.")
-            st.dataframe(combined_df)
-
-        # Save odds data to CSV
-        csv = combined_df.to_csv(index=False)
-        st.download_button(
-            label="Download Odds Data as CSV",
-            data=csv,
-            file_name="odds_data.csv",
-            mime="text/csv",
-        )
-
-        # Display arbitrage opportunities
-        st.header("Arbitrage Opportunities")
-        if all_opportunities:
-            opp_df = pd.DataFrame(all_opportunities)
-            opp_df['arb_percentage'] = opp_df['arb_percentage'].apply(lambda x: f"{x:.2f}%")
-            st.dataframe(opp_df)
-        else:
-            st.info("No arbitrage opportunities were found across all sports.")
+    show_results(poller, selected_sports, markets)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
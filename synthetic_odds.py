@@ -0,0 +1,120 @@
+"""Synthetic odds payloads in the Odds API v4 schema.
+
+Generates deterministic `/v4/sports` and `/v4/sports/{sport}/odds` payloads at any scale
+(N sports x M events x K bookmakers) for the replay server and benchmarks. Each bookmaker
+prices around a shared "true" probability with its own margin and noise, so most markets
+carry a normal overround and a small share produce arbitrage, as in live data.
+"""
+import random
+from datetime import datetime, timedelta, timezone
+
+# Bookmaker keys accepted by the Odds API (the 40-book list from main.main)
+BOOKMAKER_KEYS = [
+    'betfair_sb_uk', 'betmgm', 'betonlineag', 'betparx', 'betrivers', 'betus', 'betvictor', 'betway', 'bovada',
+    'boylesports', 'casumo', 'coral', 'draftkings', 'espnbet', 'everygame', 'fanduel', 'fliff', 'grosvenor',
+    'hardrockbet', 'ladbrokes_uk', 'leovegas', 'livescorebet', 'lowvig', 'marathonbet', 'matchbook', 'mybookieag',
+    'nordicbet', 'onexbet', 'paddypower', 'pointsbetus', 'sisportsbook', 'skybet', 'sport888', 'superbook',
+    'suprabets', 'tipico_us', 'virginbet', 'williamhill_us', 'windcreek', 'wynnbet'
+]
+SPORT_GROUPS = ['Basketball', 'Soccer', 'Football', 'Baseball', 'Hockey']
+BASE_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _isoformat(moment):
+    return moment.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def bookmaker_keys(count):
+    """The first `count` real bookmaker keys, padded with generated ones beyond 40."""
+    return BOOKMAKER_KEYS[:count] + [f"book{index}" for index in range(len(BOOKMAKER_KEYS), count)]
+
+
+def generate_sports(n_sports):
+    """A `/v4/sports` payload with `n_sports` sports spread across the main groups."""
+    sports = []
+    for index in range(n_sports):
+        group = SPORT_GROUPS[index % len(SPORT_GROUPS)]
+        sports.append({
+            'key': f"{group.lower()}_synthetic_{index}",
+            'group': group,
+            'title': f"{group} League {index}",
+            'description': f"Synthetic {group.lower()} league",
+            'active': True,
+            'has_outrights': False
+        })
+    return sports
+
+
+def _price(probability, margin, rng, noise, boost=1.0):
+    return round(max(1.01, boost / (probability * (1 + margin)) * rng.uniform(1 - noise, 1 + noise)), 2)
+
+
+def generate_odds(sport_key, n_events, n_bookmakers, markets=('h2h', 'spreads', 'totals'), seed=0, noise=0.02,
+                  alternate_lines=1, lag_rate=0.05, lag_boost=1.08, lag_seconds=300):
+    """A `/v4/sports/{sport}/odds` payload with `n_events` events quoted by `n_bookmakers` books.
+
+    Soccer sports get a three-way (draw) h2h market. `alternate_lines` extra spreads and
+    totals lines are quoted either side of each event's main line. With probability
+    `lag_rate` one bookmaker lags the market on an event and prices the first outcome of
+    each market `lag_boost` times too high, which is where most arbitrage comes from; its
+    `last_update` is `lag_seconds` older than the other books'.
+    """
+    rng = random.Random(f"{sport_key}:{seed}")
+    has_draw = sport_key.startswith('soccer')
+    keys = bookmaker_keys(n_bookmakers)
+    events = []
+
+    for index in range(n_events):
+        home, away = f"{sport_key} Home {index}", f"{sport_key} Away {index}"
+        commence = BASE_TIME + timedelta(hours=index % 72, minutes=rng.randrange(0, 60, 5))
+        p_draw = rng.uniform(0.2, 0.3) if has_draw else 0.0
+        p_home = rng.uniform(0.25, 0.75) * (1 - p_draw)
+        p_away = 1 - p_home - p_draw
+        spread = rng.choice([1.5, 2.5, 3.5, 4.5, 5.5, 6.5])
+        total = rng.choice([200.5, 210.5, 220.5, 230.5])
+        lagging_book = rng.randrange(len(keys)) if keys and rng.random() < lag_rate else None
+
+        bookmakers = []
+        for book_index, key in enumerate(keys):
+            margin = rng.uniform(0.03, 0.07)
+            boost = lag_boost if book_index == lagging_book else 1.0
+            last_update = _isoformat(BASE_TIME - timedelta(seconds=lag_seconds) if book_index == lagging_book else BASE_TIME)
+            book_markets = []
+            if 'h2h' in markets:
+                outcomes = [
+                    {'name': home, 'price': _price(p_home, margin, rng, noise, boost)},
+                    {'name': away, 'price': _price(p_away, margin, rng, noise)}
+                ]
+                if has_draw:
+                    outcomes.append({'name': 'Draw', 'price': _price(p_draw, margin, rng, noise)})
+                book_markets.append({'key': 'h2h', 'last_update': last_update, 'outcomes': outcomes})
+            lines = range(-alternate_lines, alternate_lines + 1)
+            if 'spreads' in markets:
+                outcomes = []
+                for offset in lines:
+                    outcomes.append({'name': home, 'price': _price(0.5, margin, rng, noise, boost), 'point': -(spread + offset)})
+                    outcomes.append({'name': away, 'price': _price(0.5, margin, rng, noise), 'point': spread + offset})
+                book_markets.append({'key': 'spreads', 'last_update': last_update, 'outcomes': outcomes})
+            if 'totals' in markets:
+                outcomes = []
+                for offset in lines:
+                    outcomes.append({'name': 'Over', 'price': _price(0.5, margin, rng, noise, boost), 'point': total + offset})
+                    outcomes.append({'name': 'Under', 'price': _price(0.5, margin, rng, noise), 'point': total + offset})
+                book_markets.append({'key': 'totals', 'last_update': last_update, 'outcomes': outcomes})
+            bookmakers.append({
+                'key': key,
+                'title': key.replace('_', ' ').title(),
+                'last_update': last_update,
+                'markets': book_markets
+            })
+
+        events.append({
+            'id': f"{sport_key}_{index:06d}",
+            'sport_key': sport_key,
+            'sport_title': sport_key,
+            'commence_time': _isoformat(commence),
+            'home_team': home,
+            'away_team': away,
+            'bookmakers': bookmakers
+        })
+    return events
@@ -0,0 +1,208 @@
+"""Logging setup, timing spans and metrics export.
+
+`setup_logging` routes every logger through a QueueHandler, so callers only enqueue a
+record; a QueueListener thread formats it and writes it to the log file (one JSON object
+per line) and prints warnings and errors to the console.
+
+`span(stage, **labels)` times a block of code. Every span updates an in-process histogram,
+which `prometheus_metrics()` renders in the Prometheus text format; `start_metrics_server`
+serves that on `/metrics`. When a trace file is configured (TRACE_FILE), each span is also
+appended to it as a JSONL record through the same queued, buffered path.
+
+    with span('fetch', sport=sport):
+        response = http.get(url)
+"""
+import atexit
+import functools
+import json
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import config
+
+# http.server and logging.handlers are imported where they are used: every detection module imports
+# this one, and short-lived workers never start a metrics server or configure logging.
+
+# Upper bounds (seconds) of the span duration histogram buckets
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DEFAULT_METRICS_PORT = 9108
+
+trace_logger = logging.getLogger('trace')
+trace_logger.propagate = False
+
+_listeners = []
+_setup_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message and any `extra` fields."""
+
+    RESERVED = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in self.RESERVED)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def setup_logging(level=None, log_file=None, trace_file=None, console_level=logging.WARNING):
+    """Configure queued logging once per process; later calls are no-ops.
+
+    Defaults come from config: LOG_LEVEL, LOG_FILE (empty disables the file) and TRACE_FILE
+    (empty disables the span trace).
+    """
+    with _setup_lock:
+        if _listeners:
+            return
+        level = level or config.LOG_LEVEL
+        log_file = config.LOG_FILE if log_file is None else log_file
+        trace_file = config.TRACE_FILE if trace_file is None else trace_file
+
+        handlers = []
+        console = logging.StreamHandler()
+        console.setLevel(console_level)
+        console.setFormatter(logging.Formatter('%(levelname)s %(name)s: %(message)s'))
+        handlers.append(console)
+        if log_file:
+            file_handler = logging.FileHandler(log_file)
+            file_handler.setFormatter(JsonFormatter())
+            handlers.append(file_handler)
+        _start_listener(logging.getLogger(), handlers, level)
+
+        if trace_file:
+            trace_handler = logging.FileHandler(trace_file)
+            trace_handler.setFormatter(logging.Formatter('%(message)s'))
+            _start_listener(trace_logger, [trace_handler], logging.INFO)
+        atexit.register(shutdown_logging)
+
+
+def _start_listener(logger, handlers, level):
+    from logging.handlers import QueueHandler, QueueListener
+
+    records = queue.SimpleQueue()
+    logger.addHandler(QueueHandler(records))
+    logger.setLevel(level)
+    listener = QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener threads."""
+    with _setup_lock:
+        while _listeners:
+            _listeners.pop().stop()
+
+
+class StageMetrics:
+    """Thread-safe duration histograms per (stage, labels)."""
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self._series = {}  # (stage, labels) -> {'count', 'sum', 'max', 'buckets'}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, duration, labels=()):
+        key = (stage, labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'count': 0, 'sum': 0.0, 'max': 0.0, 'buckets': [0] * len(self.buckets)}
+            series['count'] += 1
+            series['sum'] += duration
+            series['max'] = max(series['max'], duration)
+            for index, bound in enumerate(self.buckets):
+                if duration <= bound:
+                    series['buckets'][index] += 1
+
+    def snapshot(self):
+        """{(stage, labels): {'count', 'sum', 'max', 'buckets'}} copied under the lock."""
+        with self._lock:
+            return {key: dict(series, buckets=list(series['buckets'])) for key, series in self._series.items()}
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def prometheus(self):
+        """The histograms in the Prometheus text exposition format."""
+        name = 'arbitrage_stage_duration_seconds'
+        lines = [f"# HELP {name} Time spent in each pipeline stage.", f"# TYPE {name} histogram"]
+        for (stage, labels), series in sorted(self.snapshot().items()):
+            label_text = ','.join([f'stage="{stage}"', *(f'{key}="{value}"' for key, value in labels)])
+            for bound, count in zip(self.buckets, series['buckets']):
+                lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{{label_text},le="+Inf"}} {series["count"]}')
+            lines.append(f'{name}_sum{{{label_text}}} {series["sum"]:.6f}')
+            lines.append(f'{name}_count{{{label_text}}} {series["count"]}')
+        return '\n'.join(lines) + '\n'
+
+
+# Shared registry updated by every span
+stage_metrics = StageMetrics()
+
+
+@contextmanager
+def span(stage, **labels):
+    """Time the enclosed block as `stage`, recording it in stage_metrics and the JSONL trace."""
+    started_at = time.time()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        stage_metrics.observe(stage, duration, tuple(sorted(labels.items())))
+        if trace_logger.handlers:
+            trace_logger.info(json.dumps({'stage': stage, 'start': started_at, 'duration_s': duration, **labels},
+                                         default=str))
+
+
+def timed(stage, **labels):
+    """Decorator form of span for a whole function."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def prometheus_metrics():
+    return stage_metrics.prometheus()
+
+
+def start_metrics_server(host='127.0.0.1', port=DEFAULT_METRICS_PORT):
+    """Serve /metrics on a background thread and return (server, base_url)."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = prometheus_metrics().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
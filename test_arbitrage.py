@@ -0,0 +1,134 @@
+"""Detection tests for the dict engine (arbitrage_finder) and the DataFrame engine (vectorized_arbitrage).
+
+    python -m pytest -q
+"""
+import pytest
+
+from arbitrage_finder import (
+    calculate_arbitrage_percentage, find_arbitrage_opportunities, index_market_lines, opportunity_key
+)
+from odds_flattener import flatten_odds
+from synthetic_odds import generate_odds
+from vectorized_arbitrage import find_arbitrage_opportunities_df
+
+
+def dict_engine(odds_data):
+    return find_arbitrage_opportunities(odds_data)
+
+
+def frame_engine(odds_data):
+    return find_arbitrage_opportunities_df(flatten_odds({odds_data[0]['sport_key']: odds_data} if odds_data else {}))
+
+
+ENGINES = [pytest.param(dict_engine, id='dict'), pytest.param(frame_engine, id='frame')]
+
+
+def make_event(market, books, home='Home', away='Away'):
+    """One event with a single market; `books` maps bookmaker title to [(name, price, point)]."""
+    return {
+        'id': 'event-1',
+        'sport_key': 'test_sport',
+        'commence_time': '2024-03-01T00:00:00Z',
+        'home_team': home,
+        'away_team': away,
+        'bookmakers': [
+            {'key': title.lower(), 'title': title, 'markets': [{'key': market, 'outcomes': [
+                {'name': name, 'price': price, **({} if point is None else {'point': point})}
+                for name, price, point in outcomes
+            ]}]}
+            for title, outcomes in books.items()
+        ],
+    }
+
+
+def legs(opportunity):
+    return [(leg['outcome'], leg['point'], leg['bookmaker'], leg['odds']) for leg in opportunity['legs']]
+
+
+def test_spread_lines_index_by_home_team():
+    best_odds = {('Away', 3.5): {}, ('Home', -3.5): {}, ('Home', -4.5): {}, ('Away', 4.5): {}, ('Away', -1.5): {},
+                 ('Elsewhere', 1.5): {}}
+    assert index_market_lines('spreads', best_odds, ('Home', 'Away')) == {
+        -3.5: {'Away': ('Away', 3.5), 'Home': ('Home', -3.5)},
+        -4.5: {'Home': ('Home', -4.5), 'Away': ('Away', 4.5)},
+        1.5: {'Away': ('Away', -1.5)},
+    }
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_unresolved_team_spelling_is_not_paired_as_the_other_team(engine):
+    # "Man United" does not resolve to Manchester United; taking it as the other side would pair
+    # two -1.5 bets (United and City), which both lose on a draw
+    event = make_event('spreads', {
+        'BookA': [('Manchester United', 1.95, -1.5), ('Manchester City', 2.05, -1.5)],
+        'BookB': [('Man United', 2.20, -1.5), ('Manchester City', 1.60, 1.5)],
+    }, home='Manchester United', away='Manchester City')
+    assert engine([event]) == []
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_alternate_spread_lines_pair_within_their_line(engine):
+    event = make_event('spreads', {
+        'BookA': [('Home', 2.10, -3.5), ('Away', 1.80, 3.5), ('Home', 2.40, -4.5), ('Away', 1.60, 4.5)],
+        'BookB': [('Home', 1.85, -3.5), ('Away', 2.05, 3.5), ('Home', 2.30, -4.5), ('Away', 1.75, 4.5)],
+    })
+    opportunities = sorted(engine([event]), key=lambda opportunity: opportunity['legs'][0]['point'])
+    assert [legs(opportunity) for opportunity in opportunities] == [
+        [('Home', -4.5, 'BookA', 2.40), ('Away', 4.5, 'BookB', 1.75)],
+        [('Home', -3.5, 'BookA', 2.10), ('Away', 3.5, 'BookB', 2.05)],
+    ]
+    assert opportunities[1]['arb_percentage'] == pytest.approx(calculate_arbitrage_percentage(2.10, 2.05))
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_totals_at_different_lines_do_not_pair(engine):
+    # Over 220.5 and Under 221.5 at these prices would look like an arb, but they are different bets
+    event = make_event('totals', {
+        'BookA': [('Over', 2.20, 220.5), ('Under', 1.70, 220.5)],
+        'BookB': [('Over', 1.70, 221.5), ('Under', 2.20, 221.5)],
+    })
+    assert engine([event]) == []
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_three_way_market_backs_the_draw(engine):
+    event = make_event('h2h', {
+        'BookA': [('Home', 3.20, None), ('Draw', 3.00, None), ('Away', 2.90, None)],
+        'BookB': [('Home', 2.80, None), ('Draw', 3.60, None), ('Away', 3.30, None)],
+    })
+    [opportunity] = engine([event])
+    assert sorted(legs(opportunity)) == [
+        ('Away', None, 'BookB', 3.30), ('Draw', None, 'BookB', 3.60), ('Home', None, 'BookA', 3.20),
+    ]
+    assert opportunity['arb_percentage'] == pytest.approx(calculate_arbitrage_percentage(3.20, 3.60, 3.30))
+    # Stakes use the whole bankroll and every outcome pays out the same
+    stakes = [leg['stake'] for leg in opportunity['legs']]
+    payouts = [leg['stake'] * leg['odds'] for leg in opportunity['legs']]
+    assert sum(stakes) == pytest.approx(100)
+    assert payouts == pytest.approx([payouts[0]] * 3)
+    assert opportunity['profit'] == pytest.approx(payouts[0] - 100)
+
+
+def test_two_outcomes_of_a_three_way_market_are_not_an_arb():
+    # Without a draw price the two teams alone must not be reported
+    event = make_event('h2h', {
+        'BookA': [('Home', 2.10, None), ('Draw', 3.00, None), ('Away', 1.90, None)],
+        'BookB': [('Home', 1.90, None), ('Draw', 3.10, None), ('Away', 2.10, None)],
+    })
+    assert dict_engine([event]) == frame_engine([event]) == []
+
+
+def comparable(opportunities):
+    return sorted(
+        (opportunity_key(opportunity), tuple((leg['bookmaker'], leg['odds']) for leg in opportunity['legs']),
+         round(opportunity['arb_percentage'], 9), tuple(round(leg['stake'], 9) for leg in opportunity['legs']))
+        for opportunity in opportunities
+    )
+
+
+@pytest.mark.parametrize('sport', ['basketball_nba', 'soccer_epl', 'icehockey_nhl'])
+def test_engines_agree_on_synthetic_payload(sport):
+    odds_data = generate_odds(sport, 100, 8, seed=1, alternate_lines=2)  # soccer adds 3-way h2h markets
+    found = dict_engine(odds_data)
+    assert found, "synthetic payload should contain arbs"
+    assert comparable(frame_engine(odds_data)) == comparable(found)
@@ -0,0 +1,91 @@
+"""Tests for incremental_scanner and line_movement: change records and staleness scoring.
+
+    python -m pytest -q
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from incremental_scanner import IncrementalArbitrageScanner
+from line_movement import PriceHistory
+
+START = datetime(2024, 3, 1, tzinfo=timezone.utc)
+
+
+def stamp(seconds):
+    return (START + timedelta(seconds=seconds)).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def make_event(books):
+    """An h2h event; `books` maps bookmaker title to (home price, away price, seconds after START of last_update)."""
+    return {
+        'id': 'event-1',
+        'sport_key': 'basketball_nba',
+        'commence_time': stamp(86400),
+        'home_team': 'Home',
+        'away_team': 'Away',
+        'bookmakers': [
+            {'key': title.lower(), 'title': title, 'markets': [{'key': 'h2h', 'last_update': stamp(updated), 'outcomes': [
+                {'name': 'Home', 'price': home}, {'name': 'Away', 'price': away},
+            ]}]}
+            for title, (home, away, updated) in books.items()
+        ],
+    }
+
+
+def test_score_flags_legs_lagging_the_freshest_book():
+    history = PriceHistory(stale_after=120)
+    outcomes = [{'name': 'Home', 'price': 2.10}, {'name': 'Away', 'price': 1.80}]
+    history.record('event-1', 'BookA', 'h2h', outcomes, 1000)
+    history.record('event-1', 'BookB', 'h2h', outcomes, 1300)
+    legs = [{'bookmaker': 'BookA'}, {'bookmaker': 'BookB'}]
+    scores = history.score('event-1', 'h2h', legs)
+    assert scores == {'stale_seconds': 300, 'velocity': 0.0, 'stale': True}
+    assert [(leg['last_update'], leg['stale_seconds']) for leg in legs] == [(1000, 300), (1300, 0)]
+
+    # An older response arriving late does not move a book's last update back
+    history.record('event-1', 'BookA', 'h2h', outcomes, 900)
+    assert history.last_update('event-1', 'BookA', 'h2h') == 1000
+
+
+def test_velocity_is_implied_probability_movement_per_minute():
+    history = PriceHistory()
+    history.record('event-1', 'BookA', 'h2h', [{'name': 'Home', 'price': 2.0}], 0)
+    history.record('event-1', 'BookA', 'h2h', [{'name': 'Home', 'price': 2.5}], 60)  # 50% -> 40%
+    assert history.velocity('event-1', 'BookA', 'h2h') == pytest.approx(10.0)
+    assert history.market_velocity('event-1', 'h2h') == pytest.approx(10.0)
+
+
+def changes(found):
+    return [(change['type'], change['opportunity']['stale']) for change in found]
+
+
+def test_unchanged_prices_rescore_staleness():
+    scanner = IncrementalArbitrageScanner(stale_after=120)
+    assert changes(scanner.update_event(make_event({'BookA': (2.10, 1.80, 0), 'BookB': (1.85, 2.05, 0)}))) == [
+        ('open', False),
+    ]
+
+    # BookB reports the same prices five minutes later, so BookA's leg is now stale
+    assert changes(scanner.update_event(make_event({'BookA': (2.10, 1.80, 0), 'BookB': (1.85, 2.05, 300)}))) == [
+        ('update', True),
+    ]
+    # Still stale: the scores are refreshed without another change record
+    assert scanner.update_event(make_event({'BookA': (2.10, 1.80, 0), 'BookB': (1.85, 2.05, 360)})) == []
+    [opportunity] = scanner.current_opportunities()
+    assert opportunity['stale_seconds'] == 360
+
+    # BookA confirming its prices makes the opportunity fresh again
+    updated_at = (START + timedelta(seconds=360)).timestamp()
+    outcomes = [{'name': 'Home', 'price': 2.10}, {'name': 'Away', 'price': 1.80}]
+    assert changes(scanner.update_prices('event-1', 'BookA', 'h2h', outcomes, updated_at)) == [('update', False)]
+
+
+def test_price_changes_and_removal_close_opportunities():
+    scanner = IncrementalArbitrageScanner()
+    scanner.update_event(make_event({'BookA': (2.10, 1.80, 0), 'BookB': (1.85, 2.05, 0)}))
+    outcomes = [{'name': 'Home', 'price': 2.15}, {'name': 'Away', 'price': 1.80}]
+    updated_at = (START + timedelta(seconds=10)).timestamp()
+    assert changes(scanner.update_prices('event-1', 'BookA', 'h2h', outcomes, updated_at)) == [('update', False)]
+    assert [change['type'] for change in scanner.remove_event('event-1')] == ['close']
+    assert scanner.current_opportunities() == []
@@ -0,0 +1,91 @@
+"""Tests for market_edges: middle windows and the sorted near-arb index.
+
+    python -m pytest -q
+"""
+import pytest
+
+from arbitrage_finder import calculate_arbitrage_percentage
+from market_edges import MarketEdgeIndex, market_edges, market_middles
+
+TEAMS = ('Home', 'Away')
+
+
+def best(*quotes):
+    """best_odds from (name, point, bookmaker, odds) quotes."""
+    return {(name, point): {'bookmaker': bookmaker, 'odds': odds} for name, point, bookmaker, odds in quotes}
+
+
+def windows(middles):
+    return sorted((low, high, [(leg['outcome'], leg['point']) for leg in legs]) for low, high, _, legs in middles)
+
+
+def test_spread_middle_window_is_the_home_margin_both_sides_cover():
+    # Home -3.5 and Away +5.5 both win if Home wins by 4 or 5
+    middles = market_middles('spreads', best(('Home', -3.5, 'BookA', 1.95), ('Away', 5.5, 'BookB', 1.90)), TEAMS)
+    assert windows(middles) == [(3.5, 5.5, [('Home', -3.5), ('Away', 5.5)])]
+    assert middles[0][2] == pytest.approx(calculate_arbitrage_percentage(1.95, 1.90))
+
+
+def test_spread_sides_that_cannot_both_win_are_not_middles():
+    # Home -5.5 needs a 6-point win, Away +3.5 needs Home to win by 3 or fewer
+    assert market_middles('spreads', best(('Home', -5.5, 'BookA', 2.5), ('Away', 3.5, 'BookB', 1.6)), TEAMS) == []
+    # The same line on both sides is an arb candidate, not a middle
+    assert market_middles('spreads', best(('Home', -3.5, 'BookA', 1.9), ('Away', 3.5, 'BookB', 1.9)), TEAMS) == []
+
+
+def test_spread_middles_follow_the_event_teams():
+    # Listed away team first, and an outcome naming neither team
+    quotes = best(('Away', 5.5, 'BookB', 1.90), ('Home', -3.5, 'BookA', 1.95), ('Elsewhere', -1.5, 'BookC', 3.0))
+    assert windows(market_middles('spreads', quotes, TEAMS)) == [(3.5, 5.5, [('Home', -3.5), ('Away', 5.5)])]
+
+
+def test_totals_middles_pair_a_low_over_with_a_higher_under():
+    quotes = best(('Over', 220.5, 'BookA', 1.9), ('Under', 222.5, 'BookB', 1.9), ('Over', 223.5, 'BookC', 2.2),
+                  ('Under', 219.5, 'BookD', 2.2))
+    assert windows(market_middles('totals', quotes)) == [
+        (220.5, 222.5, [('Over', 220.5), ('Under', 222.5)]),
+    ]
+    assert market_middles('h2h', best(('Home', None, 'BookA', 2.1), ('Away', None, 'BookB', 2.1))) == []
+
+
+def test_market_edges_pair_each_line():
+    quotes = best(('Home', -3.5, 'BookA', 2.10), ('Away', 3.5, 'BookB', 2.05), ('Home', -4.5, 'BookA', 2.40))
+    assert [(line, [leg['bookmaker'] for leg in legs]) for line, _, legs in market_edges('spreads', quotes, TEAMS)] == [
+        (-3.5, ['BookA', 'BookB']),
+    ]
+
+
+def h2h(home_odds, away_odds):
+    return best(('Home', None, 'BookA', home_odds), ('Away', None, 'BookB', away_odds))
+
+
+def test_index_orders_replaces_and_filters_markets():
+    index = MarketEdgeIndex()
+    index.update_market('event-1', 'h2h', h2h(2.10, 2.05), sport='basketball_nba', teams=TEAMS)  # 96.4%
+    index.update_market('event-2', 'h2h', h2h(1.95, 1.95), sport='basketball_nba', teams=TEAMS)  # 102.6%
+    index.update_market('event-3', 'h2h', h2h(1.99, 1.99), sport='icehockey_nhl', teams=TEAMS)   # 100.5%
+    assert [edge['event_id'] for edge in index.tightest(3)] == ['event-1', 'event-3', 'event-2']
+    assert [edge['event_id'] for edge in index.within(1.0)] == ['event-1', 'event-3']
+    assert [edge['event_id'] for edge in index.near_arbs(1.0)] == ['event-3']
+
+    # A new price replaces the market's entry instead of adding one
+    index.update_market('event-1', 'h2h', h2h(1.90, 1.90), sport='basketball_nba', teams=TEAMS)
+    assert [edge['event_id'] for edge in index.tightest(5)] == ['event-3', 'event-2', 'event-1']
+
+
+def test_prune_removes_only_missing_events_of_the_scanned_sports():
+    index = MarketEdgeIndex()
+    index.update_market('event-1', 'h2h', h2h(2.10, 2.05), sport='basketball_nba', teams=TEAMS)
+    index.update_market('event-1', 'spreads', best(('Home', -3.5, 'BookA', 1.95), ('Away', 5.5, 'BookB', 1.90)),
+                        sport='basketball_nba', teams=TEAMS)
+    index.update_market('event-2', 'h2h', h2h(1.99, 1.99), sport='basketball_nba', teams=TEAMS)
+    index.update_market('event-3', 'h2h', h2h(1.99, 1.99), sport='icehockey_nhl', teams=TEAMS)
+
+    # event-1 finished; the NHL payload was not part of this scan
+    index.prune({'basketball_nba'}, {'event-2'})
+    assert sorted(edge['event_id'] for edge in index.tightest(10)) == ['event-2', 'event-3']
+    assert index.middle_windows() == []
+    assert set(index.event_markets) == set(index.event_sports) == {'event-2', 'event-3'}
+
+    index.remove_event('event-3')
+    assert [edge['event_id'] for edge in index.tightest(10)] == ['event-2']
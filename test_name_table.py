@@ -0,0 +1,53 @@
+"""Tests for name_table: alias, spelling and fuzzy resolution of team names.
+
+    python -m pytest -q
+"""
+from name_table import NameTable, normalize
+
+
+def test_normalize_ignores_case_punctuation_and_spacing():
+    assert normalize("St. Louis  Blues") == normalize("st louis blues") == 'st louis blues'
+
+
+def test_aliases_and_spelling_variants_resolve_to_the_canonical_name():
+    table = NameTable({'Los Angeles Clippers': ['LA Clippers', 'L.A. Clippers']})
+    assert table.canonical('LA Clippers') == 'Los Angeles Clippers'
+    assert table.canonical('la clippers') == 'Los Angeles Clippers'  # normalized spelling of an alias
+    assert table.canonical('St. Louis Blues') == 'St. Louis Blues'
+    assert table.canonical('St Louis Blues') == 'St. Louis Blues'
+    assert table.canonical(None) is None
+
+
+def test_canonical_names_are_interned_and_numbered():
+    table = NameTable()
+    name = table.canonical(''.join(['Boston ', 'Celtics']))
+    assert name is table.canonical('Boston Celtics')
+    assert table.name_of(table.id_of('boston celtics')) is name
+
+
+def test_fuzzy_match_is_limited_to_the_event_teams():
+    table = NameTable()
+    teams = (table.canonical('New York Rangers'), table.canonical('New York Islanders'))
+    assert table.canonical('New York Ranger', teams) == 'New York Rangers'
+    # Without the event's teams a misspelling is a new name rather than a guess
+    assert table.canonical('New York Ranger') == 'New York Ranger'
+
+
+def test_fuzzy_match_needs_the_cutoff_and_a_clear_winner():
+    table = NameTable()
+    # Too far from either team (0.74 against Manchester United)
+    assert table.canonical('Man United', ('Manchester United', 'Manchester City')) == 'Man United'
+    # Close to both teams: no candidate beats the other by FUZZY_MARGIN
+    assert table.canonical('Team Alph', ('Team Alpha', 'Team Alpho')) == 'Team Alph'
+    assert table.canonical('Team Alphaa', ('Team Alpha', 'Team Beta')) == 'Team Alpha'
+
+
+def test_event_teams_and_names():
+    table = NameTable({'Los Angeles Clippers': ['LA Clippers']})
+    event = {'id': 'event-1', 'sport_key': 'basketball_nba', 'home_team': 'LA Clippers', 'away_team': 'Boston Celtics'}
+    assert table.event_teams(event) == ('Los Angeles Clippers', 'Boston Celtics')
+    assert table.event_name(event) == 'Los Angeles Clippers vs Boston Celtics'
+    outright = {'id': 'event-2', 'sport_key': 'golf_masters_tournament_winner', 'sport_title': 'Masters Tournament',
+                'home_team': None, 'away_team': None}
+    assert table.event_teams(outright) == ()
+    assert table.event_name(outright) == 'Masters Tournament'
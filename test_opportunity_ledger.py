@@ -0,0 +1,105 @@
+"""Tests for opportunity_ledger: opportunity lifetimes, scoped closing and fingerprints.
+
+    python -m pytest -q
+"""
+import pytest
+
+from opportunity_ledger import OpportunityLedger, fingerprint
+
+SCOPES = [('basketball_nba', 'h2h')]
+
+
+def make_opportunity(event_id='event-1', books=('BookA', 'BookB'), arb_percentage=98.0, sport='basketball_nba',
+                     market_type='h2h'):
+    return {
+        'sport': sport,
+        'event_id': event_id,
+        'event_name': 'Home vs Away',
+        'market_type': market_type,
+        'outcome_name': 'Home vs Away',
+        'point': None,
+        'arb_percentage': arb_percentage,
+        'profit': 100 / arb_percentage * 100 - 100,
+        'legs': [{'outcome': outcome, 'point': None, 'bookmaker': book, 'odds': 2.05}
+                 for outcome, book in zip(['Home', 'Away'], books)],
+    }
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = OpportunityLedger(str(tmp_path / 'opportunities.db'))
+    yield ledger
+    ledger.close()
+
+
+def test_fingerprint_covers_legs_books_and_points():
+    opportunity = make_opportunity()
+    assert fingerprint(opportunity) == fingerprint(make_opportunity(arb_percentage=97.0))
+    assert fingerprint(opportunity) != fingerprint(make_opportunity(books=('BookA', 'BookC')))
+    assert fingerprint(opportunity) != fingerprint(make_opportunity(event_id='event-2'))
+    moved = make_opportunity()
+    moved['legs'][0]['point'] = -1.5
+    assert fingerprint(opportunity) != fingerprint(moved)
+    assert -2 ** 63 <= fingerprint(opportunity) < 2 ** 63  # fits an SQLite INTEGER
+
+
+def test_snapshot_opens_updates_and_closes(ledger):
+    ledger.record_snapshot([make_opportunity(arb_percentage=98.0)], SCOPES, seen_at=100)
+    ledger.record_snapshot([make_opportunity(arb_percentage=97.0)], SCOPES, seen_at=110)
+    [row] = ledger.query(open_only=True)
+    assert (row['first_seen'], row['last_seen'], row['observations']) == (100, 110, 2)
+    assert (row['arb_percentage'], row['best_arb_percentage']) == (97.0, 97.0)
+
+    ledger.record_snapshot([make_opportunity(arb_percentage=99.0)], SCOPES, seen_at=120)
+    [row] = ledger.query()
+    assert (row['arb_percentage'], row['best_arb_percentage']) == (99.0, 97.0)
+
+    ledger.record_snapshot([], SCOPES, seen_at=130)
+    assert ledger.query(open_only=True) == []
+    [row] = ledger.query()
+    assert (row['closed_at'], row['duration']) == (130, 30)
+
+
+def test_reopened_opportunity_gets_a_new_row(ledger):
+    key = fingerprint(make_opportunity())
+    ledger.record_snapshot([make_opportunity()], SCOPES, seen_at=100)
+    ledger.record_snapshot([], SCOPES, seen_at=110)
+    ledger.record_snapshot([make_opportunity()], SCOPES, seen_at=200)
+
+    rows = ledger.query()
+    assert [(row['fingerprint'], row['first_seen'], row['closed_at']) for row in rows] == [
+        (key, 200, None), (key, 100, 110),
+    ]
+    assert ledger.legs(key) == [
+        {'outcome': 'Home', 'point': None, 'bookmaker': 'BookA', 'odds': 2.05},
+        {'outcome': 'Away', 'point': None, 'bookmaker': 'BookB', 'odds': 2.05},
+    ]
+
+    # Acting marks the latest lifetime only
+    ledger.mark_acted(key, note='placed', acted_at=210)
+    assert [(row['acted_at'], row['note']) for row in ledger.query()] == [(210, 'placed'), (None, None)]
+
+
+def test_snapshot_only_closes_its_own_scopes(ledger):
+    nba = make_opportunity()
+    nba_spread = make_opportunity(market_type='spreads')
+    nhl = make_opportunity(event_id='event-2', sport='icehockey_nhl')
+    ledger.record_snapshot([nba, nba_spread, nhl], SCOPES + [('basketball_nba', 'spreads'), ('icehockey_nhl', 'h2h')],
+                           seen_at=100)
+
+    # A poll of NBA moneylines alone must not close the NBA spread or the NHL opportunity
+    ledger.record_snapshot([], SCOPES, seen_at=110)
+    assert sorted((row['sport'], row['market_type']) for row in ledger.query(open_only=True)) == [
+        ('basketball_nba', 'spreads'), ('icehockey_nhl', 'h2h'),
+    ]
+
+
+def test_query_filters(ledger):
+    ledger.record_snapshot([make_opportunity()], SCOPES, seen_at=100)
+    ledger.record_snapshot([make_opportunity(event_id='event-2', books=('BookC', 'BookD'))], SCOPES, seen_at=200)
+    assert [row['event_id'] for row in ledger.query(start=150)] == ['event-2']
+    assert [row['event_id'] for row in ledger.query(end=150)] == ['event-1']
+    assert [row['event_id'] for row in ledger.query(bookmaker='BookA')] == ['event-1']
+    assert ledger.query(sports=['icehockey_nhl']) == []
+    summary = {row['bookmaker']: row['opportunities'] for row in ledger.bookmaker_summary()}
+    assert summary == {'BookA': 1, 'BookB': 1, 'BookC': 1, 'BookD': 1}
@@ -0,0 +1,80 @@
+"""Tests for stake_allocator: rounding to book increments and per-book balances and limits.
+
+    python -m pytest -q
+"""
+import pytest
+
+from arbitrage_finder import calculate_arbitrage_percentage
+from stake_allocator import allocate_stakes, max_total_stake, round_stakes
+
+
+def make_opportunity(event_id, *legs):
+    """An opportunity backing one outcome per (bookmaker, odds) leg."""
+    return {
+        'event_id': event_id,
+        'market_type': 'h2h',
+        'arb_percentage': calculate_arbitrage_percentage(*(odds for _, odds in legs)),
+        'legs': [{'outcome': f'Team {position}', 'point': None, 'bookmaker': bookmaker, 'odds': odds}
+                 for position, (bookmaker, odds) in enumerate(legs)],
+    }
+
+
+def test_round_stakes_keeps_the_most_profitable_rounding():
+    legs = make_opportunity('event-1', ('BookA', 2.10), ('BookB', 2.05))['legs']
+    # The exact split is 49.40 / 50.60; rounding both up pays at least 104.55 for 101 staked
+    stakes, profit = round_stakes(legs, 100, {}, {'BookA': 1000, 'BookB': 1000}, {})
+    assert stakes == [50, 51]
+    assert profit == pytest.approx(3.55)
+
+
+def test_round_stakes_respects_increments_and_limits():
+    legs = make_opportunity('event-1', ('BookA', 2.10), ('BookB', 2.05))['legs']
+    stakes, profit = round_stakes(legs, 100, {'BookA': 5}, {'BookA': 1000, 'BookB': 1000}, {'BookB': 50})
+    assert stakes == [50, 50]
+    assert profit == pytest.approx(2.5)
+    # A balance below the rounded-up stake rules that rounding out
+    stakes, _ = round_stakes(legs, 100, {}, {'BookA': 1000, 'BookB': 50.5}, {})
+    assert stakes == [49, 50]
+
+
+def test_round_stakes_without_a_profitable_rounding():
+    # A thin arb: the 4.96 / 5.04 split can only round to 5 / 5 (which loses on BookB) or 5 / 10
+    legs = make_opportunity('event-1', ('BookA', 2.02), ('BookB', 1.99))['legs']
+    assert round_stakes(legs, 10, {'BookA': 5, 'BookB': 5}, {'BookA': 100, 'BookB': 100}, {}) == (None, 0.0)
+
+
+def test_max_total_stake_is_capped_by_the_tightest_book():
+    legs = make_opportunity('event-1', ('BookA', 2.0), ('BookB', 2.0))['legs']
+    assert max_total_stake(legs, {'BookA': 1000, 'BookB': 30}, {}) == pytest.approx(60)
+    assert max_total_stake(legs, {'BookA': 1000, 'BookB': 1000}, {'BookA': 20}) == pytest.approx(40)
+    assert max_total_stake(legs, {'BookA': 1000}, {}) == 0
+
+
+def test_allocate_stakes_funds_the_best_opportunity_first():
+    better = make_opportunity('event-1', ('BookA', 2.20), ('BookB', 2.10))
+    worse = make_opportunity('event-2', ('BookA', 2.05), ('BookC', 2.05))
+    balances = {'BookA': 100, 'BookB': 200, 'BookC': 200}
+    allocations, remaining = allocate_stakes([worse, better], balances)
+
+    # The better opportunity takes all of BookA, leaving nothing for the other one
+    assert [allocation['opportunity'] for allocation in allocations] == [better]
+    [allocation] = allocations
+    assert [leg['stake'] for leg in allocation['legs']] == [100, 105]
+    assert allocation['total_stake'] == 205
+    assert allocation['guaranteed_payout'] == pytest.approx(220)
+    assert allocation['guaranteed_profit'] == pytest.approx(15)
+    assert remaining == {'BookA': 0, 'BookB': 95, 'BookC': 200}
+
+
+def test_allocate_stakes_applies_per_book_limits_and_skips_unfunded_books():
+    capped = make_opportunity('event-1', ('BookA', 2.20), ('BookB', 2.10))
+    unfunded = make_opportunity('event-2', ('BookA', 2.30), ('BookD', 2.30))
+    not_an_arb = make_opportunity('event-3', ('BookA', 1.90), ('BookB', 1.90))
+    allocations, remaining = allocate_stakes([capped, unfunded, not_an_arb], {'BookA': 1000, 'BookB': 1000},
+                                             max_stakes={'BookB': 50}, increments={'BookA': 5})
+    [allocation] = allocations
+    assert allocation['opportunity'] is capped
+    stakes = [leg['stake'] for leg in allocation['legs']]
+    assert stakes[1] <= 50 and stakes[0] % 5 == 0
+    assert allocation['guaranteed_profit'] > 0
+    assert remaining == {'BookA': 1000 - stakes[0], 'BookB': 1000 - stakes[1]}
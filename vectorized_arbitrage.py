@@ -0,0 +1,134 @@
+"""Vectorized arbitrage engine operating on the flattened odds table.
+
+`find_arbitrage_opportunities_df` returns the same opportunity records as
+`arbitrage_finder.find_arbitrage_opportunities`, but takes the one-row-per-price
+DataFrame built by `odds_flattener.flatten_odds` (sport, event_id, event_name, bookmaker,
+market_type, team, price, point) and replaces the nested dict loops with group-bys.
+"""
+import numpy as np
+import pandas as pd
+
+from arbitrage_finder import (
+    DEFAULT_BANKROLL, MARKET_TYPES, N_WAY_MARKETS, calculate_arbitrage_percentage, create_opportunity
+)
+from odds_flattener import price_values
+from telemetry import timed
+
+OUTCOME_KEY = ['event_id', 'market_type', 'team', 'point']
+
+
+def best_prices(odds_df):
+    """Best price per (event, market, outcome, point), ordered like the dict engine's best_odds.
+
+    Ties keep the bookmaker that appears first, and rows are ordered by event, market type
+    and first appearance of each outcome so pairs come out in the same order as the loops.
+    """
+    df = odds_df[odds_df['market_type'].isin(MARKET_TYPES)].reset_index(drop=True)
+    rows = np.arange(len(df))
+
+    # Combine the factorized key columns into one integer key per outcome
+    key = np.zeros(len(df), dtype=np.int64)
+    for column in OUTCOME_KEY:
+        codes, uniques = pd.factorize(df[column], use_na_sentinel=False)
+        key = key * (len(uniques) + 1) + codes
+
+    # Sort by key, then price descending, then original row, so each key's first row is its best price
+    order = np.lexsort((rows, -df['price'].to_numpy(dtype=float), key))
+    sorted_key = key[order]
+    starts = np.flatnonzero(np.r_[True, sorted_key[1:] != sorted_key[:-1]])
+
+    best = df.iloc[order[starts]].copy()
+    best['price'] = price_values(best['price'])
+    best['row'] = order[starts]
+    best['first_row'] = np.minimum.reduceat(order, starts)
+    best['event_rank'] = best.groupby('event_id', sort=False, observed=True)['first_row'].transform('min')
+    best['market_rank'] = best['market_type'].astype(str).map({m: i for i, m in enumerate(MARKET_TYPES)})
+    return best.sort_values(['event_rank', 'market_rank', 'first_row']).reset_index(drop=True)
+
+
+def _n_way_markets(best):
+    """Best-price rows of every h2h/outrights market with at least two outcomes and a possible arb."""
+    n_way = best[best['market_type'].isin(N_WAY_MARKETS)]
+    market = [n_way['event_id'], n_way['market_type']]
+    implied = pd.Series(1 / n_way['price'].to_numpy(dtype=float), index=n_way.index)
+    total = implied.groupby(market, sort=False, observed=True).transform('sum')
+    size = implied.groupby(market, sort=False, observed=True).transform('size')
+    # Small tolerance so rounding in the grouped sum never drops a market; records re-check exactly
+    return n_way[(size >= 2) & (total * 100 < 100 + 1e-9)]
+
+
+def _line_pairs(best):
+    """Pair complementary spreads/totals sides (Over/Under at one total, -x against +x) with a possible arb."""
+    lines = best[best['market_type'].isin(['spreads', 'totals'])].dropna(subset=['point'])
+    # Spreads are keyed from the home team's perspective, as in index_market_lines. The flattened
+    # table has no team columns, but event_name is "home vs away" built from the canonical names,
+    # so each outcome's side follows from it; outcomes naming neither team are dropped.
+    spreads = (lines['market_type'] == 'spreads').to_numpy()
+    side = np.array([
+        1.0 if not spread or event_name.startswith(f"{team} vs ") else -1.0 if event_name.endswith(f" vs {team}") else 0.0
+        for spread, event_name, team in zip(spreads, lines['event_name'].astype(str), lines['team'].astype(str))
+    ])
+    lines = lines[side != 0].assign(line=(lines['point'].to_numpy(dtype=float) * side)[side != 0])
+
+    line_key = ['event_id', 'market_type', 'line']
+    lines = lines[lines.groupby(line_key, sort=False, observed=True)['team'].transform('size') == 2]
+    lines = lines.sort_values(['event_rank', 'market_rank', 'line', 'first_row'], kind='stable')
+    first = lines.iloc[0::2].reset_index(drop=True)
+    second = lines.iloc[1::2].reset_index(drop=True)
+    pairs = first.join(second[['team', 'point', 'bookmaker', 'price', 'first_row']].add_suffix('_b'))
+
+    arb_percentage = (1 / pairs['price'].to_numpy(dtype=float) + 1 / pairs['price_b'].to_numpy(dtype=float)) * 100
+    return pairs[arb_percentage < 100 + 1e-9]
+
+
+def _point_value(point):
+    return None if pd.isna(point) else point
+
+
+def _leg(bookmaker, price, point):
+    return {'bookmaker': bookmaker, 'odds': price, 'point': _point_value(point)}
+
+
+@timed('detect', engine='df')
+def find_arbitrage_opportunities_df(odds_df, bankroll=DEFAULT_BANKROLL):
+    """Find arbitrage opportunities in a flattened odds DataFrame."""
+    if odds_df.empty:
+        return []
+
+    best = best_prices(odds_df)
+    found = []  # (sort key, opportunity) so records come out in the dict engine's order
+
+    # N-way markets are contiguous in `best`, so split them on changes of (event, market)
+    n_way = _n_way_markets(best)
+    market_id = n_way['event_rank'].to_numpy() * len(MARKET_TYPES) + n_way['market_rank'].to_numpy()
+    bounds = np.flatnonzero(np.r_[True, market_id[1:] != market_id[:-1], True]).tolist() if len(n_way) else []
+    sports, event_ids, event_names, market_types, teams, points, bookmakers, prices, event_ranks, market_ranks, first_rows = (
+        n_way[column].tolist() for column in
+        ['sport', 'event_id', 'event_name', 'market_type', 'team', 'point', 'bookmaker', 'price', 'event_rank', 'market_rank', 'first_row']
+    )
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        arb_percentage = calculate_arbitrage_percentage(*prices[start:end])
+        if arb_percentage >= 100:
+            continue
+        best_odds = {
+            (teams[i], _point_value(points[i])): _leg(bookmakers[i], prices[i], points[i]) for i in range(start, end)
+        }
+        found.append(((event_ranks[start], market_ranks[start], first_rows[start], -1),
+                      create_opportunity(event_names[start], str(market_types[start]), best_odds, arb_percentage, bankroll,
+                                         event_id=event_ids[start], sport=sports[start])))
+
+    pairs = _line_pairs(best)
+    for pair in pairs.itertuples(index=False):
+        arb_percentage = calculate_arbitrage_percentage(pair.price, pair.price_b)
+        if arb_percentage >= 100:
+            continue
+        best_odds = {
+            (pair.team, _point_value(pair.point)): _leg(pair.bookmaker, pair.price, pair.point),
+            (pair.team_b, _point_value(pair.point_b)): _leg(pair.bookmaker_b, pair.price_b, pair.point_b)
+        }
+        found.append(((pair.event_rank, pair.market_rank, pair.first_row, pair.first_row_b),
+                      create_opportunity(pair.event_name, str(pair.market_type), best_odds, arb_percentage, bankroll,
+                                         event_id=pair.event_id, sport=pair.sport)))
+
+    found.sort(key=lambda item: item[0])
+    return [opportunity for _, opportunity in found]